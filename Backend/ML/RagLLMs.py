@@ -2,91 +2,340 @@ import json
 import os
 import numpy as np
 import faiss, datetime
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
+import threading
+import time
+from transformers import TextIteratorStreamer
+from Backend.ML.atomic_files import replace_atomically
+from Backend.ML.embedding_store import EmbeddingStore
+from Backend.ML.document_store import DocumentStore
+from Backend.ML import index_factory
+from Backend.ML.answer_cache import AnswerCache
+from Backend.ML import inference_backends
+from Backend.ML.metrics import MODEL_LOAD_SECONDS, PIPELINE_ERRORS, RAG_ANSWERS, RAG_RETRIEVAL_SCORE, \
+    RAG_STAGE_SECONDS, RAG_TOKENS, RAG_TTFT_SECONDS
+from Backend.ML.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from Backend.ML.interaction_store import open_interaction_store
 
 class RAGLLM:
-    def __init__(self, booking_data_path='Data/formatted_analysis.json', index_path='Data/faiss_index.index', storage_file='Data/local_db.json'):
+    generation_kwargs = {
+        "max_new_tokens": 50,
+        "temperature": 0.1,  # Less creative, more factual
+        "repetition_penalty": 1.2,
+        "do_sample": False
+    }
+
+    fallback_answer = "I'm having trouble answering that right now."
+
+    # Common useless phrases stripped from the start of answers
+    filler_phrases = [
+        "Based on the context provided,",
+        "According to the information,",
+        "As per the context,",
+        "From the context, I can tell you that",
+        "I can answer that"
+    ]
+
+    def __init__(self, booking_data_path='Data/formatted_analysis.json', index_path='Data/faiss_index.index', storage_file='Data/local_db.jsonl',
+                 embedding_model='all-MiniLM-L6-v2', embedder=None, llm=None, embedding_store_dir='Data/embeddings',
+                 storage_mode='memory', document_store_dir='Data/documents', index_type='flat', index_params=None,
+                 cache_params=None, structured_answerer=None, retrieval_mode='hybrid', lexical_dir=None,
+                 inference_backend='torch', model_cache_dir='Data/models'):
         """
-        Initialize the RAG system with actual data and proper error handling
+        Initialize the RAG system with actual data and proper error handling.
+        A preloaded embedder or LLM pipeline can be passed in to share it.
+        storage_mode='mmap' keeps documents and index vectors in memory-mapped
+        files so several worker processes share them through the OS cache.
+        index_type picks the search structure (flat, ivf_flat, ivf_pq, hnsw);
+        index_params holds nlist/pq_m/nbits/hnsw_m/ef_construction and the
+        query-time nprobe/ef_search. cache_params configures the answer cache
+        (max_entries, ttl_seconds, similarity_threshold). A StructuredAnswerer
+        answers numeric questions from the bookings table before retrieval.
+        retrieval_mode='hybrid' fuses a BM25 index (stored in lexical_dir,
+        next to the FAISS index by default) with the dense results.
+        inference_backend runs the embedder and generator in fp32 PyTorch
+        ('torch'), int8-quantised PyTorch ('int8') or ONNX Runtime ('onnx',
+        'onnx-int8'); ONNX exports are cached under model_cache_dir.
         """
+        if storage_mode not in ('memory', 'mmap'):
+            raise ValueError(f"Unknown storage mode: {storage_mode}")
+        if index_type not in index_factory.INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}")
+        if retrieval_mode not in ('dense', 'hybrid'):
+            raise ValueError(f"Unknown retrieval mode: {retrieval_mode}")
+        inference_backends.check_backend(inference_backend)
         # Validate data paths first
         if not os.path.exists(booking_data_path):
             raise FileNotFoundError(f"Booking data file not found at {booking_data_path}")
-            
+
+        # Load the embedder once and reuse it for indexing and querying
+        self.embedding_model = embedding_model
+        self.embedding_store_dir = embedding_store_dir
+        self.storage_mode = storage_mode
+        self.document_store_dir = document_store_dir
+        self.index_type = index_type
+        self.index_params = dict(index_params or {})
+        self.retrieval_mode = retrieval_mode
+        self.lexical_index = None
+        if retrieval_mode == 'hybrid':
+            self.lexical_index = LexicalIndex(lexical_dir or os.path.splitext(index_path)[0] + '_bm25')
+        self.inference_backend = inference_backend
+        self.model_cache_dir = model_cache_dir
+        started = time.perf_counter()
+        self.embedder = embedder if embedder is not None else inference_backends.load_embedder(
+            embedding_model, inference_backend, model_cache_dir)
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - started, component='embedder')
+        self.booking_data_path = booking_data_path
+        self.index_path = index_path
+        started = time.perf_counter()
         self.index, self.documents = self.load_or_build_faiss_index(booking_data_path, index_path)
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - started, component='index')
+        self.answer_cache = AnswerCache(**(cache_params or {}))
+        self.structured_answerer = structured_answerer
         self.storage_file = storage_file
         self.local_storage = self.load_local_storage()
-        self.llm = self.connect_local_llm()
+        # The batched pipeline and streamed generations share one fast tokenizer,
+        # which raises "Already borrowed" when used from two threads at once
+        self.llm_lock = threading.RLock()
+        started = time.perf_counter()
+        self.llm = llm if llm is not None else self.connect_local_llm()
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - started, component='generator')
 
     def load_local_storage(self):
-        """Load local storage with better error handling"""
-        if os.path.exists(self.storage_file):
-            try:
-                with open(self.storage_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Failed to load local storage - {str(e)}")
-                return []
-        return []
+        """
+        Open the interaction log. History stays on disk and is paged on demand;
+        storage_file picks the backend (.jsonl append-only log or .sqlite WAL)
+        """
+        return open_interaction_store(self.storage_file)
+
+    def get_history(self, offset=0, limit=50):
+        """Stored interactions, newest first"""
+        return self.local_storage.page(offset, limit)
 
     def connect_local_llm(self):
         """Initialize LLM with better model parameters"""
         try:
             # Using a more modern small model
-            llm_pipeline = pipeline(
-                "text-generation",
-                model="openai-community/gpt2-medium",
-                device_map="auto",
+            llm_pipeline = inference_backends.load_generator(
+                inference_backends.GENERATOR_MODEL, self.inference_backend, self.model_cache_dir
             )
+            # Batched generation needs a pad token; GPT-2 pads on the left
+            if llm_pipeline.tokenizer.pad_token is None:
+                llm_pipeline.tokenizer.pad_token = llm_pipeline.tokenizer.eos_token
+            llm_pipeline.tokenizer.padding_side = "left"
             return llm_pipeline
         except Exception as e:
             raise RuntimeError(f"LLM initialization failed: {str(e)}")
 
+    def read_index_mmap(self, index_path):
+        """Open a saved index read-only with its vectors memory-mapped"""
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        # Newer FAISS builds can also map flat codes in place
+        flags |= getattr(faiss, 'IO_FLAG_MMAP_IFC', 0)
+        index = faiss.read_index(index_path, flags)
+        return index_factory.configure_search(index, self.index_params)
+
+    @staticmethod
+    def write_index(index, index_path):
+        """
+        Save the index under a new inode rather than rewriting the file in
+        place: other workers may have the current one memory-mapped
+        """
+        replace_atomically(index_path, lambda tmp_path: faiss.write_index(index, tmp_path))
+
     def load_or_build_faiss_index(self, booking_data_path, index_path):
-        """Build/load FAISS index with actual data validation"""
+        """Build/load FAISS index, embedding only documents that changed since the last run"""
+        mmap_mode = self.storage_mode == 'mmap'
+        # Document ids depend on the embedding model and the inference backend
+        store = EmbeddingStore(self.embedding_store_dir, self.embedding_model, self.inference_backend)
+        if mmap_mode:
+            # Skip parsing and embedding entirely when the mapped files are current
+            doc_store = DocumentStore(self.document_store_dir)
+            signature = DocumentStore.source_signature(booking_data_path, store.model_key)
+            if (doc_store.is_fresh(signature) and os.path.exists(index_path)
+                    and index_factory.meta_matches(index_path, self.index_type, self.index_params)
+                    and (self.lexical_index is None or self.lexical_index.is_fresh(
+                        LexicalIndex.source_signature(booking_data_path, store.model_key)))):
+                self.document_lookup = doc_store.open().get_by_id
+                if self.lexical_index is not None:
+                    self.lexical_index.load(mmap=True)
+                return self.read_index_mmap(index_path), doc_store
+
         with open(booking_data_path, 'r') as f:
             documents = json.load(f)
             
         if not documents:
             raise ValueError("No documents found in booking data")
 
-        # Create embeddings with batching
-        embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        # Reuse stored embeddings and encode only new or modified documents
         texts = [doc["text"] for doc in documents]
-        
-        # Batch processing for large datasets
-        batch_size = 32
-        embeddings = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i+batch_size]
-            embeddings.append(embedder.encode(batch, convert_to_numpy=True))
-        embeddings = np.concatenate(embeddings)
-
-        d = embeddings.shape[1]
-        if os.path.exists(index_path):
-            index = faiss.read_index(index_path)
+        ids, embeddings, _ = store.sync(
+            texts, lambda batch: self.embedder.encode(batch, convert_to_numpy=True), batch_size=32,
+            mmap=mmap_mode
+        )
+
+        # Documents are looked up by their content-hash id
+        doc_ids = [store.document_id(text) for text in texts]
+        if self.lexical_index is not None:
+            self.load_or_build_lexical_index(booking_data_path, documents, doc_ids, store.model_key, mmap_mode)
+        if mmap_mode:
+            doc_store.build(documents, doc_ids, signature)
         else:
-            index = faiss.IndexFlatIP(d)  # Using inner product for similarity
-            index = faiss.IndexIDMap2(index)
-            index.add_with_ids(embeddings, np.array([i for i in range(len(documents))]))
-            faiss.write_index(index, index_path)
+            doc_by_id = {}
+            for doc_id, doc in zip(doc_ids, documents):
+                doc_by_id.setdefault(doc_id, doc)
+            self.document_lookup = doc_by_id.get
+
+        index = None
+        if os.path.exists(index_path) and index_factory.meta_matches(index_path, self.index_type, self.index_params):
+            index = faiss.read_index(index_path)
+            if not isinstance(index, faiss.IndexIDMap2) or index.d != embeddings.shape[1]:
+                index = None  # Older index layout, rebuild it
+
+        if index is not None:
+            # Patch the existing index with the delta
+            indexed_ids = faiss.vector_to_array(index.id_map)
+            stale_ids = np.setdiff1d(indexed_ids, ids)
+            new_mask = ~np.isin(ids, indexed_ids)
+            if len(stale_ids) and not index_factory.supports_remove(index):
+                index = None  # Approximate indexes are retrained instead
+            else:
+                if len(stale_ids):
+                    index.remove_ids(stale_ids.astype(np.int64))
+                if new_mask.any():
+                    index.add_with_ids(index_factory.normalize(embeddings[new_mask]), ids[new_mask])
+                if len(stale_ids) or new_mask.any():
+                    self.write_index(index, index_path)
+                index_factory.configure_search(index, self.index_params)
+
+        if index is None:
+            # Normalised vectors make inner product equal to cosine similarity
+            index, built_type = index_factory.build_index(
+                self.index_type, index_factory.normalize(embeddings), ids, self.index_params
+            )
+            self.write_index(index, index_path)
+            index_factory.write_meta(index_path, built_type, self.index_params)
+
+        if mmap_mode:
+            # Drop the private copies and serve from the mapped files
+            del index, documents, embeddings
+            self.document_lookup = doc_store.open().get_by_id
+            return self.read_index_mmap(index_path), doc_store
             
         return index, documents
     
-    def retrieve_documents(self, query, top_k=5):
+    def load_or_build_lexical_index(self, booking_data_path, documents, doc_ids, model_key, mmap_mode=False):
+        """Load the persisted BM25 index, rebuilding it when the source file or the document ids changed"""
+        signature = LexicalIndex.source_signature(booking_data_path, model_key)
+        if self.lexical_index.is_fresh(signature):
+            try:
+                return self.lexical_index.load(mmap=mmap_mode)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Rebuilding unreadable lexical index - {str(e)}")
+                PIPELINE_ERRORS.inc(pipeline='rag', stage='lexical_index')
+        unique = {}
+        for doc_id, doc in zip(doc_ids, documents):
+            unique.setdefault(doc_id, doc)
+        return self.lexical_index.build(
+            list(unique), [doc["text"] for doc in unique.values()],
+            [doc.get("metadata", {}).get("category", "") for doc in unique.values()], signature
+        )
+
+    def rebuild_index(self):
+        """Reload documents and index from disk and drop answers based on the old index"""
+        self.index, self.documents = self.load_or_build_faiss_index(self.booking_data_path, self.index_path)
+        self.answer_cache.invalidate()
+
+    def retrieve_documents(self, query, top_k=5, category=None):
         """Retrieve and preprocess documents for better context clarity"""
-        query_embedding = self.embedder.encode([query], convert_to_numpy=True)
-        distances, indices = self.index.search(query_embedding, top_k)
-    
+        return self.retrieve_documents_batch([query], top_k, category)[0]
+
+    def retrieve_documents_batch(self, queries, top_k=5, category=None):
+        """Retrieve documents for several queries with one encode and one index search"""
+        if all(self.is_keyword_query(query) for query in queries):
+            return [self.search_keywords(query, top_k, category) for query in queries]
+        return self.search_documents(self.embed_queries(queries), top_k, queries, category)
+
+    def retrieve_for_messages(self, messages, embeddings, categories, top_k=5):
+        """
+        Documents per message: BM25 alone where no embedding was computed
+        (keyword queries), otherwise one search per category over the rest
+        """
+        results = [None] * len(messages)
+        rows_by_category = {}
+        for row, (message, embedding, category) in enumerate(zip(messages, embeddings, categories)):
+            if embedding is None:
+                results[row] = self.search_keywords(message, top_k, category)
+            else:
+                rows_by_category.setdefault(category, []).append(row)
+        for category, rows in rows_by_category.items():
+            found = self.search_documents(np.stack([embeddings[row] for row in rows]), top_k,
+                                          [messages[row] for row in rows], category)
+            for row, docs in zip(rows, found):
+                results[row] = docs
+        return results
+
+    def search_keywords(self, query, top_k=5, category=None):
+        """BM25-only retrieval for short keyword lookups ("BB meal", "PRT"), without an embed"""
+        started = time.perf_counter()
+        ids, scores = self.lexical_index.search(query, top_k, category)
+        if len(scores):
+            RAG_RETRIEVAL_SCORE.observe(float(scores[0]), retriever='bm25')
+        docs = self.lookup_documents(ids.tolist(), top_k, category)
+        RAG_STAGE_SECONDS.observe(time.perf_counter() - started, stage='retrieve')
+        return docs
+
+    def is_keyword_query(self, query, max_terms=3):
+        """A few tokens, all of them in the BM25 vocabulary, and no question words"""
+        if self.lexical_index is None:
+            return False
+        tokens = query.split()
+        if not tokens or len(tokens) > max_terms or query.strip().endswith('?'):
+            return False
+        known = self.lexical_index.known_terms(query)
+        return len(known) == len(tokens) and not any(
+            token in ('what', 'how', 'why', 'when', 'where', 'who', 'which') for token in known)
+
+    def embed_queries(self, queries):
+        """Normalised query embeddings, shared by the answer cache and retrieval"""
+        with RAG_STAGE_SECONDS.time(stage='embed'):
+            return index_factory.normalize(self.embedder.encode(list(queries), convert_to_numpy=True))
+
+    def search_documents(self, query_embeddings, top_k=5, queries=None, category=None):
+        """
+        Dense search, fused by reciprocal rank with BM25 when the query texts
+        are given and a lexical index is loaded
+        """
+        started = time.perf_counter()
+        hybrid = queries is not None and self.lexical_index is not None
+        # Fusion and category filtering need candidates beyond the final top_k
+        depth = top_k * 4 if hybrid or category is not None else top_k
+        distances, indices = self.index.search(query_embeddings, depth)
+
+        results = []
+        for row, found in enumerate(indices):
+            ranking = [int(idx) for idx in found if idx >= 0]
+            if ranking:
+                RAG_RETRIEVAL_SCORE.observe(float(distances[row][0]), retriever='dense')
+            if hybrid:
+                lexical_ids, lexical_scores = self.lexical_index.search(queries[row], depth, category)
+                if len(lexical_scores):
+                    RAG_RETRIEVAL_SCORE.observe(float(lexical_scores[0]), retriever='bm25')
+                ranking = reciprocal_rank_fusion([ranking, lexical_ids.tolist()])
+            results.append(self.lookup_documents(ranking, top_k, category))
+        RAG_STAGE_SECONDS.observe(time.perf_counter() - started, stage='retrieve')
+        return results
+
+    def lookup_documents(self, ranking, top_k=5, category=None):
         retrieved_docs = []
-        for idx in indices[0]:
-            if idx < len(self.documents):
-                doc = self.documents[idx]
-                # Preprocess the document text for better readability
-                doc_text = f"{doc['metadata']['category'].title()}: {doc['text']}"
-                retrieved_docs.append({"text": doc_text, "metadata": doc["metadata"]})
+        for idx in ranking:
+            doc = self.document_lookup(int(idx))
+            if doc is None or (category is not None and doc['metadata'].get('category') != category):
+                continue
+            # Preprocess the document text for better readability
+            doc_text = f"{doc['metadata']['category'].title()}: {doc['text']}"
+            retrieved_docs.append({"text": doc_text, "metadata": doc["metadata"]})
+            if len(retrieved_docs) == top_k:
+                break
         return retrieved_docs
     
     def preprocess_query(self, query):
@@ -146,8 +395,8 @@ class RAGLLM:
         
         return full_response  # Return as is if we can't extract cleanly
 
-    def generate_response_with_llm(self, query, retrieved_docs, query_info=None):
-        """Improved generation with context validation"""
+    def build_prompt(self, query, retrieved_docs, query_info=None):
+        """Assemble the LLM prompt and the context snippet kept for verification"""
         # Use only the top 3 most relevant documents for context
         context = "\n".join([doc["text"] for doc in retrieved_docs][:3])
         context_snippet = context[:200]  # Store first 200 chars for verification
@@ -169,23 +418,199 @@ class RAGLLM:
             f"Query: {query}\n"
             f"Answer:"
         )
-        
+        return prompt, context_snippet
+
+    def generate_response_with_llm(self, query, retrieved_docs, query_info=None):
+        """Improved generation with context validation"""
+        prompt, context_snippet = self.build_prompt(query, retrieved_docs, query_info)
+        return self.generate_answers([prompt])[0], context_snippet
+
+    def generate_answers(self, prompts):
+        """Generate answers for several prompts in one batched pipeline call"""
         try:
-            full_response = self.llm(
-                prompt,
-                max_new_tokens=50,
-                temperature=0.1,  # Less creative, more factual
-                repetition_penalty=1.2,
-                do_sample=False
-            )[0]['generated_text']
+            with RAG_STAGE_SECONDS.time(stage='generate'), self.llm_lock:
+                outputs = self.llm(
+                    list(prompts),
+                    batch_size=len(prompts),
+                    **self.generation_kwargs
+                )
+            for output, prompt in zip(outputs, prompts):
+                self.record_token_counts(prompt, output[0]['generated_text'][len(prompt):])
             
             # Extract just the answer part
-            clean_answer = self.extract_answer_from_response(full_response, prompt)
-            
-            return clean_answer, context_snippet
+            return [
+                self.extract_answer_from_response(output[0]['generated_text'], prompt)
+                for output, prompt in zip(outputs, prompts)
+            ]
         except Exception as e:
             print(f"Generation error: {str(e)}")
-            return "I'm having trouble answering that right now.", context_snippet
+            PIPELINE_ERRORS.inc(pipeline='rag', stage='generate')
+            return [self.fallback_answer] * len(prompts)
+
+    def record_token_counts(self, prompt, generated):
+        tokenizer = getattr(self.llm, 'tokenizer', None)
+        if tokenizer is None:
+            return
+        with self.llm_lock:
+            prompt_tokens = len(tokenizer(prompt)['input_ids'])
+            generated_tokens = len(tokenizer(generated)['input_ids'])
+        RAG_TOKENS.observe(prompt_tokens, kind='prompt')
+        RAG_TOKENS.observe(generated_tokens, kind='generated')
+
+    def generate_response_stream(self, prompt):
+        """
+        Yield generated text pieces as the model produces them. Each stream
+        runs its own generate call outside the micro-batcher, holding
+        llm_lock, so streams and batches take turns on the model.
+        """
+        tokenizer = self.llm.tokenizer
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=120)
+        errors = []
+
+        def _generate():
+            try:
+                # The streamer decodes with the shared tokenizer inside generate
+                with self.llm_lock:
+                    inputs = tokenizer(prompt, return_tensors="pt").to(self.llm.model.device)
+                    self.llm.model.generate(
+                        **inputs, streamer=streamer, pad_token_id=tokenizer.pad_token_id, **self.generation_kwargs
+                    )
+            except Exception as e:
+                errors.append(e)
+                streamer.end()  # Unblock the consumer
+
+        thread = threading.Thread(target=_generate, name="llm-stream", daemon=True)
+        thread.start()
+        for piece in streamer:
+            yield piece
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    def clean_partial_response(self, full_response, prompt):
+        """
+        Answer text that is safe to show while generation is still running.
+        Text that may still turn into a filler phrase is held back.
+        """
+        partial = self.extract_answer_from_response(full_response, prompt).strip()
+        for phrase in self.filler_phrases:
+            if phrase.startswith(partial):
+                return ""
+            if partial.startswith(phrase):
+                partial = partial[len(phrase):].strip()
+        return partial
+
+    def answer_structured(self, message, query_info):
+        """Exact answer from a bookings lookup, or None when retrieval and generation are needed"""
+        if self.structured_answerer is None:
+            return None
+        started = time.perf_counter()
+        answer = self.structured_answerer.answer(message)
+        RAG_STAGE_SECONDS.observe(time.perf_counter() - started, stage='structured')
+        if answer is None:
+            return None
+        RAG_ANSWERS.inc(source='structured')
+        response, details = answer
+        query_info = dict(query_info, structured=details)
+        timings = {"total_ms": round(1000 * (time.perf_counter() - started), 1)}
+        context_snippet = f"Bookings lookup: {details['metric']} {json.dumps(details['filters'])}"
+        self.store_response(message, response, context_snippet, [], query_info, timings=timings)
+        return {
+            "response": response,
+            "retrieved_docs": [],
+            "context_snippet": context_snippet,
+            "query_info": query_info,
+            "raw_response": response,
+            "cache": None,
+            "structured": True
+        }
+
+    def stream_message(self, message, category=None):
+        """
+        RAG workflow that yields answer text as it is generated, followed by a
+        final event with the postprocessed answer and its timings. category
+        restricts retrieval to documents of one metadata category. Streams
+        are not micro-batched: each one embeds, searches and generates on
+        its own.
+        """
+        started = time.perf_counter()
+        with RAG_STAGE_SECONDS.time(stage='preprocess'):
+            query_info = self.preprocess_query(message)
+
+        structured = self.answer_structured(message, query_info)
+        if structured is not None:
+            RAG_TTFT_SECONDS.observe(time.perf_counter() - started, source='structured')
+            timings = {"ttft_ms": round(1000 * (time.perf_counter() - started), 1)}
+            timings["total_ms"] = timings["ttft_ms"]
+            yield {"event": "done", "response": structured["response"], "cache": None,
+                   "structured": True, **timings}
+            return
+
+        # Keyword queries skip the embed, and with it the semantic cache level
+        query_embedding = None if self.is_keyword_query(message) else self.embed_queries([message])[0]
+
+        # Cached answers are not scoped to a category
+        cached, level = None, None
+        if category is None:
+            with RAG_STAGE_SECONDS.time(stage='cache_lookup'):
+                cached, level = self.answer_cache.lookup(query_info, query_embedding)
+        if cached is not None:
+            RAG_ANSWERS.inc(source=f"cache_{level}")
+            RAG_TTFT_SECONDS.observe(time.perf_counter() - started, source=f"cache_{level}")
+            timings = {"ttft_ms": round(1000 * (time.perf_counter() - started), 1)}
+            timings["total_ms"] = timings["ttft_ms"]
+            self.store_response(message, cached["response"], cached["context_snippet"],
+                                cached["retrieved_docs"], query_info, timings=timings)
+            yield {"event": "done", "response": cached["response"], "cache": level, **timings}
+            return
+
+        retrieved_docs = self.retrieve_for_messages([message], [query_embedding], [category])[0]
+        prompt, context_snippet = self.build_prompt(message, retrieved_docs, query_info)
+
+        generated = ""
+        sent = ""
+        first_token_at = None
+        generate_started = time.perf_counter()
+        try:
+            for piece in self.generate_response_stream(prompt):
+                generated += piece
+                partial = self.clean_partial_response(prompt + generated, prompt)
+                # Only ever append; anything that rewrites earlier text waits for the final answer
+                if len(partial) > len(sent) and partial.startswith(sent):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        RAG_TTFT_SECONDS.observe(first_token_at - started, source='generated')
+                    yield {"event": "token", "text": partial[len(sent):]}
+                    sent = partial
+            raw_response = self.extract_answer_from_response(prompt + generated, prompt)
+            RAG_STAGE_SECONDS.observe(time.perf_counter() - generate_started, stage='generate')
+            self.record_token_counts(prompt, generated)
+        except Exception as e:
+            print(f"Generation error: {str(e)}")
+            PIPELINE_ERRORS.inc(pipeline='rag', stage='generate')
+            raw_response = self.fallback_answer
+        RAG_ANSWERS.inc(source='fallback' if raw_response == self.fallback_answer else 'generated')
+
+        with RAG_STAGE_SECONDS.time(stage='postprocess'):
+            final_response = self.postprocess_response(raw_response, query_info)
+        finished = time.perf_counter()
+        if first_token_at is None:
+            # Nothing was streamed, so the final answer is the first text the client sees
+            RAG_TTFT_SECONDS.observe(finished - started, source='fallback' if raw_response == self.fallback_answer
+                                     else 'generated')
+        timings = {
+            "ttft_ms": None if first_token_at is None else round(1000 * (first_token_at - started), 1),
+            "total_ms": round(1000 * (finished - started), 1)
+        }
+        self.store_response(message, final_response, context_snippet, retrieved_docs, query_info, timings=timings)
+        if raw_response != self.fallback_answer and category is None:
+            self.answer_cache.put(query_info, query_embedding, {
+                "response": final_response,
+                "retrieved_docs": retrieved_docs,
+                "context_snippet": context_snippet,
+                "raw_response": raw_response
+            }, finished - started)
+        yield {"event": "done", "response": final_response, "cache": None, **timings}
 
     def postprocess_response(self, response, query_info=None):
         """
@@ -195,15 +620,7 @@ class RAGLLM:
         clean_response = response.strip()
         
         # Remove common useless phrases
-        filler_phrases = [
-            "Based on the context provided,",
-            "According to the information,",
-            "As per the context,",
-            "From the context, I can tell you that",
-            "I can answer that"
-        ]
-        
-        for phrase in filler_phrases:
+        for phrase in self.filler_phrases:
             if clean_response.startswith(phrase):
                 clean_response = clean_response[len(phrase):].strip()
         
@@ -227,49 +644,103 @@ class RAGLLM:
         
         return clean_response
 
-    def store_response(self, query, response, context_snippet, retrieved_docs, query_info=None):
+    def store_response(self, query, response, context_snippet, retrieved_docs, query_info=None, timings=None):
         """Store responses with context verification"""
+        started = time.perf_counter()
         document = {
             "query": query,
             "response": response,
             "context_snippet": context_snippet,
             "retrieved_docs": retrieved_docs,  # Store all retrieved docs
             "query_info": query_info,  # Store the query analysis
+            "timings": timings,
             "timestamp": datetime.datetime.now().isoformat()
         }
+        # Buffered and appended to disk in the background
         self.local_storage.append(document)
-        
-        try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(self.local_storage, f, indent=2)
-        except IOError as e:
-            print(f"Storage error: {str(e)}")
+        RAG_STAGE_SECONDS.observe(time.perf_counter() - started, stage='store')
 
-    def process_message(self, message):
+    def process_message(self, message, category=None):
         """Complete RAG workflow with preprocessing and postprocessing"""
-        # Step 1: Preprocess the query
-        query_info = self.preprocess_query(message)
-        
-        # Step 2: Retrieve relevant documents
-        retrieved_docs = self.retrieve_documents(message)
-        
-        # Step 3: Generate initial response
-        raw_response, context_snippet = self.generate_response_with_llm(message, retrieved_docs, query_info)
-        
-        # Step 4: Postprocess the response
-        final_response = self.postprocess_response(raw_response, query_info)
+        return self.process_messages([message], [category])[0]
+
+    def process_messages(self, messages, categories=None):
+        """
+        Run the RAG workflow for a batch of messages, sharing the encode,
+        search and generation calls. categories optionally restricts each
+        message's retrieval to one metadata category.
+        """
+        categories = list(categories) if categories is not None else [None] * len(messages)
+        # Step 1: Preprocess the queries
+        with RAG_STAGE_SECONDS.time(stage='preprocess'):
+            query_infos = [self.preprocess_query(message) for message in messages]
+
+        # Step 2: Answer numeric questions straight from the bookings table
+        results = [self.answer_structured(message, query_info)
+                   for message, query_info in zip(messages, query_infos)]
+        unstructured = [i for i, result in enumerate(results) if result is None]
+        if not unstructured:
+            return results
+        # Keyword queries are retrieved by BM25 alone, so they are not embedded
+        query_embeddings = [None] * len(messages)
+        dense = [i for i in unstructured if not self.is_keyword_query(messages[i])]
+        if dense:
+            for i, embedding in zip(dense, self.embed_queries([messages[i] for i in dense])):
+                query_embeddings[i] = embedding
+
+        # Step 3: Answer repeated questions from the cache (not scoped to a category)
+        for i in unstructured:
+            if categories[i] is not None:
+                continue
+            query_info, embedding = query_infos[i], query_embeddings[i]
+            with RAG_STAGE_SECONDS.time(stage='cache_lookup'):
+                cached, level = self.answer_cache.lookup(query_info, embedding)
+            if cached is not None:
+                RAG_ANSWERS.inc(source=f"cache_{level}")
+                results[i] = dict(cached, query_info=query_info, cache=level)
+                self.store_response(messages[i], cached["response"], cached["context_snippet"],
+                                    cached["retrieved_docs"], query_info)
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        started = time.perf_counter()
+
+        # Step 4: Retrieve relevant documents
+        retrieved = self.retrieve_for_messages([messages[i] for i in pending], [query_embeddings[i] for i in pending],
+                                               [categories[i] for i in pending])
         
-        # Step 5: Store the complete interaction
-        self.store_response(message, final_response, context_snippet, retrieved_docs, query_info)
+        # Step 5: Generate initial responses
+        prompts = [
+            self.build_prompt(messages[i], docs, query_infos[i])
+            for i, docs in zip(pending, retrieved)
+        ]
+        raw_responses = self.generate_answers([prompt for prompt, _ in prompts])
+        compute_seconds = (time.perf_counter() - started) / len(pending)
         
-        # Return the result with all necessary fields
-        return {
-            "response": final_response,
-            "retrieved_docs": retrieved_docs,
-            "context_snippet": context_snippet,
-            "query_info": query_info,
-            "raw_response": raw_response  # For debugging
-        }
+        for i, retrieved_docs, (_, context_snippet), raw_response in zip(pending, retrieved, prompts, raw_responses):
+            message, query_info = messages[i], query_infos[i]
+
+            # Step 6: Postprocess the response
+            with RAG_STAGE_SECONDS.time(stage='postprocess'):
+                final_response = self.postprocess_response(raw_response, query_info)
+            RAG_ANSWERS.inc(source='fallback' if raw_response == self.fallback_answer else 'generated')
+            
+            # Step 7: Store the complete interaction
+            self.store_response(message, final_response, context_snippet, retrieved_docs, query_info)
+            
+            # Return the result with all necessary fields
+            results[i] = {
+                "response": final_response,
+                "retrieved_docs": retrieved_docs,
+                "context_snippet": context_snippet,
+                "query_info": query_info,
+                "raw_response": raw_response,  # For debugging
+                "cache": None
+            }
+            if raw_response != self.fallback_answer and categories[i] is None:
+                self.answer_cache.put(query_info, query_embeddings[i], results[i], compute_seconds)
+        return results
 
     def run_all(self, message):
         return self.process_message(message)
\ No newline at end of file
@@ -1,11 +1,86 @@
+import time
+from dataclasses import dataclass
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')  # Headless rendering, also from the snapshot rebuild thread
 import seaborn as sns
-from matplotlib.patches import Wedge, Arc
+from matplotlib.figure import Figure
+from matplotlib.patches import Wedge, Arc, Circle
+from matplotlib.ticker import MaxNLocator
+from Backend.ML.booking_store import BookingStore
+from Backend.ML.density import Histogram, kde
+from Backend.ML.downsample import lttb
+from Backend.ML.metrics import ANALYTICS_STAGE_SECONDS
+
+def rank_counts(counts, k=None):
+    """
+    Counts by descending frequency with ties broken by label, so full and
+    incremental aggregation pick the same top k
+    """
+    counts = pd.Series(counts.values, index=counts.index.astype(str), name='count')
+    counts = counts[counts > 0]
+    order = sorted(range(len(counts)), key=lambda i: (-counts.iloc[i], counts.index[i]))
+    ranked = counts.iloc[order]
+    return ranked if k is None else ranked.iloc[:k]
+
+@dataclass
+class AnalyticsResults:
+    """Every KPI and label set the dashboard needs, computed in one pass"""
+    revenue_trend: pd.DataFrame
+    cancellation_rate: float
+    country_counts: pd.Series
+    segment_counts: pd.Series
+    room_counts: pd.Series
+    meal_counts: pd.Series
+    lead_time: Histogram  # One bin per day
+
+    @property
+    def countries(self):
+        return self.country_counts.index.tolist()
+
+    @property
+    def segments(self):
+        return self.segment_counts.index.tolist()
+
+    @property
+    def rooms(self):
+        return self.room_counts.index.tolist()
+
+    @property
+    def meals(self):
+        return self.meal_counts.index.tolist()
+
 
 class DataAnalyzer:
-    def __init__(self):
-        self.df = self._load_data()
+    # Output key -> render method, each taking an AnalyticsResults
+    charts = {
+        'revenue_fig': 'render_revenue_trend',
+        'gauge_fig': 'render_cancellation_rate',
+        'country_fig': 'render_geo_distribution',
+        'customer_seg_fig': 'render_customer_segmentation',
+        'lead_time_fig': 'render_lead_time_distribution',
+        'room_meal_fig': 'render_room_meal_distribution'
+    }
+    # Output key -> booking columns its chart reads
+    chart_columns = {
+        'revenue_fig': ['arrival_date', 'revenue'],
+        'gauge_fig': ['is_canceled'],
+        'country_fig': ['country'],
+        'customer_seg_fig': ['customer_segment'],
+        'lead_time_fig': ['lead_time'],
+        'room_meal_fig': ['reserved_room_type', 'meal']
+    }
+
+
+    def __init__(self, store=None, aggregates=None):
+        """
+        With an IncrementalAggregates the KPIs come from its running state
+        and no booking rows are loaded. Otherwise the table is read on the
+        first aggregate(), so chart render workers never load it.
+        """
+        self.store = store or BookingStore()
+        self.aggregates = aggregates
+        self._df = None
         self.style = {
             'font_color': 'white',
             'bg_color': '#ff6b6bb9',
@@ -16,10 +91,31 @@ class DataAnalyzer:
             ]
         }
 
+    @property
+    def df(self):
+        if self._df is None:
+            self._df = self._load_data()
+        return self._df
+
     def _load_data(self):
-        df = pd.read_csv('Data/cleaned_hotel_bookings.csv')
-        df['revenue'] = df['adr'] * (df['stays_in_weekend_nights'] + df['stays_in_week_nights'])
-        return df
+        # Only the columns the charts read, from the typed Parquet cache
+        columns = list(dict.fromkeys(c for cols in self.chart_columns.values() for c in cols))
+        return self.store.load(columns)
+
+    def aggregate(self):
+        """Compute every groupby/value_counts once"""
+        if self.aggregates is not None:
+            return self.aggregates.results()
+        df = self.df
+        return AnalyticsResults(
+            revenue_trend=df.groupby('arrival_date', as_index=False)['revenue'].sum(),
+            cancellation_rate=(df['is_canceled'].sum() / len(df)) * 100,
+            country_counts=rank_counts(df['country'].value_counts(), 5),
+            segment_counts=rank_counts(df['customer_segment'].value_counts()),
+            room_counts=rank_counts(df['reserved_room_type'].value_counts(), 3),
+            meal_counts=rank_counts(df['meal'].value_counts(), 3),
+            lead_time=Histogram.from_values(df['lead_time'].to_numpy())
+        )
 
     def _configure_plot(self, fig, ax):
         fig.patch.set_alpha(0)
@@ -30,31 +126,44 @@ class DataAnalyzer:
         ax.xaxis.label.set_color(self.style['font_color'])
         ax.yaxis.label.set_color(self.style['font_color'])
 
-    def generate_revenue_trend(self):
-        df_grouped = self.df.groupby('arrival_date', as_index=False)['revenue'].sum()
-        fig, ax = plt.subplots(figsize=(26, 8))
+    def generate_revenue_trend(self, results=None):
+        return self.render_revenue_trend(results or self.aggregate())
+
+    def render_revenue_trend(self, results):
+        df_grouped = results.revenue_trend
+        fig = Figure(figsize=(26, 8))
+        ax = fig.subplots()
         self._configure_plot(fig, ax)
         
         sns.lineplot(data=df_grouped, x='arrival_date', y='revenue', 
                     color='white', linewidth=2.5, ax=ax)
-        ax.xaxis.set_major_locator(plt.MaxNLocator(10))
+        ax.xaxis.set_major_locator(MaxNLocator(10))
         return fig
 
-    def generate_cancellation_rate(self):
-        cancellation_rate = (self.df['is_canceled'].sum() / len(self.df)) * 100
-        fig = plt.figure(figsize=(8, 4), facecolor='none')
+    def generate_cancellation_rate(self, results=None):
+        results = results or self.aggregate()
+        return self.render_cancellation_rate(results), results.cancellation_rate
+
+    def render_cancellation_rate(self, results):
+        cancellation_rate = results.cancellation_rate
+        fig = Figure(figsize=(8, 4), facecolor='none')
         ax = fig.add_subplot(111, aspect='equal')
         
         # Gauge elements
         ax.add_patch(Arc((0.5, 0.5), 0.6, 0.6, theta1=0, theta2=180, color='lightgray', lw=20))
         ax.add_patch(Wedge((0.5, 0.5), 0.3, 0.6, 180*cancellation_rate/100, width=0.09, color=self.style['colors'][0]))
-        plt.text(0.5, 0.5, f'{cancellation_rate:.1f}%', ha='center', va='center', fontsize=24, color='white')
+        ax.text(0.5, 0.5, f'{cancellation_rate:.1f}%', ha='center', va='center', fontsize=24, color='white')
         ax.axis('off')
-        return fig, cancellation_rate
+        return fig
 
-    def generate_geo_distribution(self):
-        country_counts = self.df['country'].value_counts().nlargest(5)
-        fig, ax = plt.subplots(figsize=(12, 8))
+    def generate_geo_distribution(self, results=None):
+        results = results or self.aggregate()
+        return self.render_geo_distribution(results), results.countries
+
+    def render_geo_distribution(self, results):
+        country_counts = results.country_counts
+        fig = Figure(figsize=(12, 8))
+        ax = fig.subplots()
         self._configure_plot(fig, ax)
         
         # Create vertical bar chart
@@ -85,14 +194,19 @@ class DataAnalyzer:
         ax.spines['top'].set_visible(False)
         ax.spines['right'].set_visible(False)
         
-        return fig, country_counts.index.tolist()
+        return fig
 
-    def generate_customer_segmentation(self):
+    def generate_customer_segmentation(self, results=None):
+        results = results or self.aggregate()
+        return self.render_customer_segmentation(results), results.segments
+
+    def render_customer_segmentation(self, results):
         # Get customer segmentation data
-        segment_counts = self.df['customer_segment'].value_counts()
+        segment_counts = results.segment_counts
         
         # Create figure and axis
-        fig, ax = plt.subplots(figsize=(8, 8))
+        fig = Figure(figsize=(8, 8))
+        ax = fig.subplots()
         self._configure_plot(fig, ax)  # Apply consistent styling
         
         # Create donut pie chart
@@ -112,7 +226,7 @@ class DataAnalyzer:
             autotext.set_fontweight('bold')
         
         # Add center circle for donut effect
-        centre_circle = plt.Circle((0, 0), 0.4, fc='none')
+        centre_circle = Circle((0, 0), 0.4, fc='none')
         ax.add_artist(centre_circle)
         
         # Remove unnecessary spines
@@ -121,22 +235,22 @@ class DataAnalyzer:
         ax.spines['right'].set_visible(False)
         ax.legend = 'labels'
         
-        return fig, segment_counts.index.tolist()
+        return fig
 
-    def generate_lead_time_distribution(self):
+    def generate_lead_time_distribution(self, results=None):
+        return self.render_lead_time_distribution(results or self.aggregate())
+
+    def render_lead_time_distribution(self, results):
         # Create figure and axis
-        fig, ax = plt.subplots(figsize=(24, 8))
+        fig = Figure(figsize=(24, 8))
+        ax = fig.subplots()
         self._configure_plot(fig, ax)  # Apply consistent styling
         
-        # Create KDE plot
-        sns.kdeplot(
-            data=self.df,
-            x='lead_time',  # Assuming 'lead_time' is the column name
-            color=self.style['colors'][4],  # Use primary color
-            fill=True,  # Fill under the curve
-            alpha=0.5,  # Transparency
-            ax=ax
-        )
+        # KDE from the lead time histogram, same curve as sns.kdeplot
+        x, density = kde(results.lead_time)
+        color = self.style['colors'][4]  # Use primary color
+        ax.fill_between(x, density, color=color, alpha=0.5)  # Fill under the curve
+        ax.plot(x, density, color=color)
         
         # Customize the chart
         ax.set_xlabel('Lead Time (Days)', color=self.style['font_color'])
@@ -148,13 +262,21 @@ class DataAnalyzer:
         
         return fig
 
-    def generate_room_meal_distribution(self):
+    def generate_room_meal_distribution(self, results=None):
+        results = results or self.aggregate()
+        return self.render_room_meal_distribution(results), {
+            'rooms': results.rooms,
+            'meals': results.meals
+        }
+
+    def render_room_meal_distribution(self, results):
         # Get data for room types and meals
-        room_counts = self.df['reserved_room_type'].value_counts().nlargest(3)
-        meal_counts = self.df['meal'].value_counts().nlargest(3)
+        room_counts = results.room_counts
+        meal_counts = results.meal_counts
         
         # Create figure and axis
-        fig, ax = plt.subplots(figsize=(8, 8))
+        fig = Figure(figsize=(8, 8))
+        ax = fig.subplots()
         self._configure_plot(fig, ax)  # Apply consistent styling
         
         # Define colors for outer and inner pie charts
@@ -189,7 +311,7 @@ class DataAnalyzer:
             autotext.set_fontweight('bold')
         
         # Add center circle for donut effect
-        centre_circle = plt.Circle((0, 0), 0.4, fc='none')
+        centre_circle = Circle((0, 0), 0.4, fc='none')
         ax.add_artist(centre_circle)
         
         # Remove unnecessary spines
@@ -197,22 +319,96 @@ class DataAnalyzer:
         ax.spines['top'].set_visible(False)
         ax.spines['right'].set_visible(False)
         
-        return fig, {
-            'rooms': room_counts.index.tolist(),
-            'meals': meal_counts.index.tolist()
+        return fig
+
+    def generate_data(self, points=None):
+        """
+        The aggregates behind every chart as plain JSON-serialisable values,
+        for rendering in the browser. points caps the revenue series with
+        LTTB downsampling.
+        """
+        started = time.perf_counter()
+        with ANALYTICS_STAGE_SECONDS.time(stage='aggregate'):
+            results = self.aggregate()
+        trend = results.revenue_trend
+        revenue = trend['revenue'].to_numpy()
+        keep = lttb(revenue, points) if points else slice(None)
+        x, density = kde(results.lead_time)
+
+        def counts(series):
+            return {'labels': series.index.tolist(), 'counts': [int(c) for c in series]}
+
+        payload = {
+            'revenue': {
+                'dates': trend['arrival_date'].astype(str).to_numpy()[keep].tolist(),
+                'values': [round(float(v), 2) for v in revenue[keep]],
+                'total_points': len(trend)
+            },
+            'cancellation_rate': round(float(results.cancellation_rate), 2),
+            'countries': counts(results.country_counts),
+            'segments': counts(results.segment_counts),
+            'rooms': counts(results.room_counts),
+            'meals': counts(results.meal_counts),
+            'lead_time': {
+                'x': [round(float(v), 2) for v in x],
+                'density': [float(f'{v:.6g}') for v in density]
+            },
+            'colors': self.style['colors']
         }
+        ANALYTICS_STAGE_SECONDS.observe(time.perf_counter() - started, stage='data')
+        return payload
 
     def generate_analytics(self):
+        """
+        Aggregate once and render every chart. The figures are not tracked
+        by pyplot; close_figures releases their artists early.
+        """
+        results = self.aggregate()
+        figures = {}
+        try:
+            for key in self.charts:
+                figures[key] = self.render_chart(key, results)
+        except Exception:
+            self.close_figures(figures)
+            raise
+        return {
+            **figures,
+            'cancellation_rate': results.cancellation_rate,
+            'countries': results.countries,
+            'segments': results.segments,
+            'rooms': results.rooms,  # Room labels
+            'meals': results.meals  # Meal labels
+        }
+
+    def render_chart(self, key, results):
+        """Draw one chart of self.charts from an AnalyticsResults"""
+        return getattr(self, self.charts[key])(results)
+
+    def generate_encoded_analytics(self, encode=None, renderer=None):
+        """
+        Aggregate once, then render and encode every chart. With a
+        ChartRenderer the charts are drawn and encoded in its worker
+        processes; otherwise each is passed to encode(fig) in turn.
+        """
+        with ANALYTICS_STAGE_SECONDS.time(stage='aggregate'):
+            results = self.aggregate()
+        with ANALYTICS_STAGE_SECONDS.time(stage='render'):
+            if renderer is not None:
+                encoded = renderer.render(results)
+            else:
+                encoded = {key: encode(self.render_chart(key, results)) for key in self.charts}
         return {
-            'revenue_fig': self.generate_revenue_trend(),
-            'gauge_fig': self.generate_cancellation_rate()[0],
-            'country_fig': self.generate_geo_distribution()[0],
-            'customer_seg_fig': self.generate_customer_segmentation()[0],
-            'lead_time_fig': self.generate_lead_time_distribution(),
-            'room_meal_fig': self.generate_room_meal_distribution()[0],  # New chart
-            'cancellation_rate': self.generate_cancellation_rate()[1],
-            'countries': self.generate_geo_distribution()[1],
-            'segments': self.generate_customer_segmentation()[1],
-            'rooms': self.generate_room_meal_distribution()[1]['rooms'],  # Room labels
-            'meals': self.generate_room_meal_distribution()[1]['meals']  # Meal labels
-        }
\ No newline at end of file
+            **encoded,
+            'cancellation_rate': results.cancellation_rate,
+            'countries': results.countries,
+            'segments': results.segments,
+            'rooms': results.rooms,
+            'meals': results.meals
+        }
+
+    @staticmethod
+    def close_figures(analytics):
+        """Release every matplotlib figure in a generate_analytics result"""
+        for value in analytics.values():
+            if isinstance(value, Figure):
+                value.clear()
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import threading
+from Backend.ML.atomic_files import write_json_atomically
+from Backend.ML.metrics import PIPELINE_ERRORS
+
+# Bumped whenever the rendered charts or the payload layout change
+SNAPSHOT_VERSION = 1
+
+class AnalyticsSnapshotCache:
+    def __init__(self, build, source_path='Data/cleaned_hotel_bookings.csv',
+                 cache_path='Data/cache/analytics_snapshot.json'):
+        """
+        Serve the /analytics payload from a snapshot keyed on the source CSV's
+        size and mtime and on SNAPSHOT_VERSION. build() returns the
+        JSON-serialisable payload; it runs once per data change, in the
+        background when a stale snapshot can be served in the meantime.
+        """
+        self.build = build
+        self.source_path = source_path
+        self.cache_path = cache_path
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def fingerprint(self):
+        stat = os.stat(self.source_path)
+        return f"v{SNAPSHOT_VERSION}-{stat.st_size}-{stat.st_mtime_ns}"
+
+    @staticmethod
+    def _make_snapshot(fingerprint, payload):
+        body = json.dumps(payload).encode('utf-8')
+        return {
+            "fingerprint": fingerprint,
+            "etag": hashlib.sha256(body).hexdigest()[:32],
+            "body": body
+        }
+
+    def _load_from_disk(self):
+        try:
+            with open(self.cache_path, 'rb') as f:
+                stored = json.loads(f.read())
+            # Snapshots rendered by other code are rebuilt, not served while rebuilding
+            if stored.get("version") != SNAPSHOT_VERSION:
+                return None
+            return self._make_snapshot(stored["fingerprint"], stored["payload"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_to_disk(self, fingerprint, payload):
+        try:
+            write_json_atomically(self.cache_path, {"version": SNAPSHOT_VERSION, "fingerprint": fingerprint,
+                                                    "payload": payload})
+        except OSError as e:
+            print(f"Warning: Failed to persist analytics snapshot - {str(e)}")
+            PIPELINE_ERRORS.inc(pipeline='analytics', stage='snapshot_save')
+
+    def _rebuild(self, fingerprint):
+        payload = self.build()
+        snapshot = self._make_snapshot(fingerprint, payload)
+        self._save_to_disk(fingerprint, payload)
+        self._snapshot = snapshot
+        return snapshot
+
+    def _rebuild_in_background(self, fingerprint):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def _run():
+            try:
+                self._rebuild(fingerprint)
+            except Exception as e:
+                print(f"Warning: Analytics snapshot rebuild failed - {str(e)}")
+                PIPELINE_ERRORS.inc(pipeline='analytics', stage='snapshot_rebuild')
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=_run, name="analytics-snapshot", daemon=True).start()
+
+    def get(self):
+        """Current snapshot: {"fingerprint", "etag", "body"}"""
+        fingerprint = self.fingerprint()
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load_from_disk()
+                snapshot = self._snapshot
+            if snapshot is None:
+                # Nothing to serve yet, so build in the request
+                with self._lock:
+                    if self._snapshot is None or self._snapshot["fingerprint"] != fingerprint:
+                        self._rebuild(fingerprint)
+                    return self._snapshot
+
+        if snapshot["fingerprint"] != fingerprint:
+            # Serve the previous snapshot while the new one is computed
+            self._rebuild_in_background(fingerprint)
+        return snapshot
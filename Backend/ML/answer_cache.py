@@ -0,0 +1,123 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+import faiss
+import numpy as np
+
+class AnswerCache:
+    def __init__(self, max_entries=1024, ttl_seconds=3600, similarity_threshold=0.95):
+        """
+        Two-level answer cache: an exact match on the normalised query, then
+        a semantic match over embeddings of past queries. Entries expire after
+        ttl_seconds and the least recently used ones are evicted beyond
+        max_entries.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # normalised query -> entry
+        self._key_of_id = {}
+        self._next_id = 0
+        self._semantic_index = None
+        self._exact_hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._saved_seconds = 0.0
+
+    @staticmethod
+    def entity_tokens(query):
+        """Numbers and short upper-case codes (years, country, room and meal codes)"""
+        return frozenset(
+            token for token in re.findall(r"[A-Za-z0-9]+", query)
+            if any(c.isdigit() for c in token) or (token.isupper() and len(token) <= 3)
+        )
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        del self._key_of_id[entry["id"]]
+        if self._semantic_index is not None and entry["has_embedding"]:
+            self._semantic_index.remove_ids(np.array([entry["id"]], dtype=np.int64))
+
+    def _expired(self, entry, now):
+        return self.ttl_seconds is not None and now - entry["created"] > self.ttl_seconds
+
+    def lookup(self, query_info, embedding=None):
+        """Return (result, level) for a cached answer, or (None, None) on a miss"""
+        key = query_info["normalized_query"]
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._drop(key)
+                entry = None
+            level = "exact" if entry is not None else None
+
+            if entry is None and embedding is not None and self._semantic_index is not None \
+                    and self._semantic_index.ntotal:
+                query = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+                scores, ids = self._semantic_index.search(query, 1)
+                if ids[0][0] >= 0 and scores[0][0] >= self.similarity_threshold:
+                    candidate = self._entries[self._key_of_id[int(ids[0][0])]]
+                    # Similar wording about a different country or year is not the same question
+                    if not self._expired(candidate, now) and \
+                            candidate["entities"] == self.entity_tokens(query_info["original_query"]):
+                        entry, level = candidate, "semantic"
+
+            if entry is None:
+                self._misses += 1
+                return None, None
+
+            self._entries.move_to_end(entry["key"])
+            if level == "exact":
+                self._exact_hits += 1
+            else:
+                self._semantic_hits += 1
+            self._saved_seconds += entry["compute_seconds"]
+            return entry["result"], level
+
+    def put(self, query_info, embedding, result, compute_seconds=0.0):
+        key = query_info["normalized_query"]
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            entry_id = self._next_id
+            self._next_id += 1
+            has_embedding = embedding is not None
+            if has_embedding:
+                vector = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+                if self._semantic_index is None:
+                    self._semantic_index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+                self._semantic_index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[key] = {
+                "id": entry_id,
+                "key": key,
+                "result": result,
+                "entities": self.entity_tokens(query_info["original_query"]),
+                "has_embedding": has_embedding,
+                "created": time.monotonic(),
+                "compute_seconds": compute_seconds
+            }
+            self._key_of_id[entry_id] = key
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self):
+        """Forget every cached answer, e.g. after the document index was rebuilt"""
+        with self._lock:
+            self._entries.clear()
+            self._key_of_id.clear()
+            self._semantic_index = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self._exact_hits + self._semantic_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self._exact_hits,
+                "semantic_hits": self._semantic_hits,
+                "misses": self._misses,
+                "hit_rate": (self._exact_hits + self._semantic_hits) / lookups if lookups else 0.0,
+                "saved_seconds": round(self._saved_seconds, 3)
+            }
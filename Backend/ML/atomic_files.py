@@ -0,0 +1,29 @@
+import json
+import os
+import tempfile
+
+def replace_atomically(path, write):
+    """
+    Call write(tmp_path) on a temporary file unique to this writer, in the
+    same directory as path, then rename it over path. Workers writing the
+    same cache at once never share a partially written file, and readers
+    (including ones that have the old file mapped) only ever see a
+    complete file.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_json_atomically(path, data):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+    replace_atomically(path, write)
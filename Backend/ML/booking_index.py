@@ -0,0 +1,214 @@
+import datetime
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from Backend.ML.analytics import rank_counts
+from Backend.ML.booking_store import BookingStore
+from Backend.ML.metrics import ANALYTICS_STAGE_SECONDS
+
+# Filterable dimension -> (output key, how many top labels to return, None for all)
+DIMENSIONS = {
+    'hotel': ('hotels', None),
+    'country': ('countries', 5),
+    'customer_segment': ('segments', None),
+    'reserved_room_type': ('rooms', 3),
+    'meal': ('meals', 3)
+}
+
+def normalize_filters(filters):
+    """
+    Canonical form of a filter mapping: ISO start/end dates and a sorted
+    tuple of labels per dimension. Raises ValueError on a bad date or an
+    unknown dimension.
+    """
+    normalized = {}
+    for bound in ('start', 'end'):
+        value = filters.get(bound)
+        if value:
+            normalized[bound] = datetime.date.fromisoformat(str(value).strip()).isoformat()
+    for dim, values in filters.items():
+        if dim in ('start', 'end'):
+            continue
+        if dim not in DIMENSIONS:
+            raise ValueError(f"Unknown filter '{dim}'")
+        if isinstance(values, str):
+            values = [values]
+        labels = sorted({label.strip() for value in values for label in str(value).split(',') if label.strip()})
+        if labels:
+            normalized[dim] = tuple(labels)
+    return normalized
+
+
+class BookingIndex:
+    def __init__(self, store=None, cache_entries=512):
+        """
+        Bookings sorted by arrival date with per-date running totals and,
+        for each dimension, the sorted row positions of every label. A date
+        range is a slice, a label filter a lookup, so filtered KPIs never
+        scan the table. Results are cached on the normalised filter and the
+        index is rebuilt when the bookings CSV changes.
+        """
+        self.store = store or BookingStore()
+        self.cache_entries = cache_entries
+        self._lock = threading.Lock()
+        self._state = None
+        self._fingerprint = None
+        self._cache = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._build_seconds = None
+
+    def _build(self):
+        df = self.store.load(['arrival_date', 'is_canceled', 'revenue'] + list(DIMENSIONS))
+        dates = df['arrival_date'].astype(str).to_numpy()
+        order = np.argsort(dates, kind='stable')
+        unique_dates, date_codes = np.unique(dates[order], return_inverse=True)
+        n_dates = len(unique_dates)
+        canceled = df['is_canceled'].to_numpy()[order].astype(np.int64)
+        revenue = df['revenue'].to_numpy()[order].astype(np.float64)
+
+        state = {
+            'dates': unique_dates,
+            'date_codes': date_codes,
+            # Rows of date d are day_start[d]:day_start[d + 1]
+            'day_start': np.searchsorted(date_codes, np.arange(n_dates + 1)),
+            'canceled': canceled,
+            'revenue': revenue,
+            'cum_canceled': np.concatenate([[0], np.cumsum(np.bincount(date_codes, weights=canceled,
+                                                                          minlength=n_dates))]).astype(np.int64),
+            'revenue_by_date': np.bincount(date_codes, weights=revenue, minlength=n_dates),
+            'dims': {}
+        }
+        for dim in DIMENSIONS:
+            column = pd.Categorical(df[dim].astype(str).to_numpy()[order])
+            codes = column.codes.astype(np.int64)
+            labels = [str(label) for label in column.categories]
+            by_label = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[by_label], np.arange(len(labels) + 1))
+            per_date = np.bincount(date_codes * len(labels) + codes,
+                                   minlength=n_dates * len(labels)).reshape(n_dates, len(labels))
+            state['dims'][dim] = {
+                'labels': labels,
+                'code_of': {label: code for code, label in enumerate(labels)},
+                'codes': codes,
+                # Ascending row positions of each label, since rows are already date ordered
+                'postings': [by_label[bounds[i]:bounds[i + 1]] for i in range(len(labels))],
+                'cum_counts': np.vstack([np.zeros((1, len(labels)), dtype=np.int64), np.cumsum(per_date, axis=0)])
+            }
+        return state
+
+    def _current_state(self):
+        fingerprint = self.store.fingerprint()
+        with self._lock:
+            if self._state is None or fingerprint != self._fingerprint:
+                started = time.perf_counter()
+                self._state = self._build()
+                self._build_seconds = time.perf_counter() - started
+                self._fingerprint = fingerprint
+                self._cache.clear()
+            return self._state
+
+    def labels(self, dim):
+        """Every label of a dimension present in the bookings"""
+        return self._current_state()['dims'][dim]['labels']
+
+    def query(self, filters):
+        """Cancellation rate, revenue trend and top-k counts of the bookings matching filters"""
+        normalized = normalize_filters(filters)
+        state = self._current_state()
+        key = tuple(sorted(normalized.items()))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return {**cached, 'cached': True}
+            self._misses += 1
+
+        started = time.perf_counter()
+        result = self._compute(state, normalized)
+        result['elapsed_ms'] = 1000 * (time.perf_counter() - started)
+        ANALYTICS_STAGE_SECONDS.observe(result['elapsed_ms'] / 1000, stage='query')
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return {**result, 'cached': False}
+
+    def _compute(self, state, normalized):
+        dates = state['dates']
+        lo = int(np.searchsorted(dates, normalized['start'], 'left')) if 'start' in normalized else 0
+        hi = int(np.searchsorted(dates, normalized['end'], 'right')) if 'end' in normalized else len(dates)
+        hi = max(lo, hi)
+        dim_filters = {dim: labels for dim, labels in normalized.items() if dim in DIMENSIONS}
+
+        if not dim_filters:
+            # Date range only: differences of the per-date running totals
+            rows = int(state['day_start'][hi] - state['day_start'][lo])
+            canceled = int(state['cum_canceled'][hi] - state['cum_canceled'][lo])
+            revenue = state['revenue_by_date'][lo:hi]
+            keep = np.diff(state['day_start'][lo:hi + 1]) > 0
+            counts = {dim: index['cum_counts'][hi] - index['cum_counts'][lo]
+                      for dim, index in state['dims'].items()}
+        else:
+            selected = self._select(state, dim_filters, state['day_start'][lo], state['day_start'][hi])
+            rows = len(selected)
+            canceled = int(state['canceled'][selected].sum())
+            day = state['date_codes'][selected] - lo
+            revenue = np.bincount(day, weights=state['revenue'][selected], minlength=hi - lo)
+            keep = np.bincount(day, minlength=hi - lo) > 0
+            counts = {dim: np.bincount(index['codes'][selected], minlength=len(index['labels']))
+                      for dim, index in state['dims'].items()}
+
+        result = {
+            'filters': {key: list(value) if isinstance(value, tuple) else value for key, value in normalized.items()},
+            'rows': rows,
+            'canceled': canceled,
+            'total_revenue': round(float(revenue.sum()), 2),
+            'cancellation_rate': round(100 * canceled / rows, 2) if rows else 0.0,
+            'revenue': {
+                'dates': dates[lo:hi][keep].tolist(),
+                'values': [round(float(v), 2) for v in revenue[keep]]
+            }
+        }
+        for dim, (output_key, k) in DIMENSIONS.items():
+            ranked = rank_counts(pd.Series(counts[dim], index=state['dims'][dim]['labels']), k)
+            result[output_key] = {'labels': ranked.index.tolist(), 'counts': [int(c) for c in ranked]}
+        return result
+
+    @staticmethod
+    def _select(state, dim_filters, row_lo, row_hi):
+        """Sorted row positions within [row_lo, row_hi) matching every dimension filter"""
+        matches = []
+        for dim, labels in dim_filters.items():
+            index = state['dims'][dim]
+            parts = []
+            for label in labels:
+                code = index['code_of'].get(label)
+                if code is None:
+                    continue
+                postings = index['postings'][code]
+                parts.append(postings[np.searchsorted(postings, row_lo):np.searchsorted(postings, row_hi)])
+            positions = np.sort(np.concatenate(parts)) if len(parts) > 1 else \
+                (parts[0] if parts else np.empty(0, dtype=np.int64))
+            matches.append(positions)
+        # Intersect the smallest lists first
+        matches.sort(key=len)
+        selected = matches[0]
+        for positions in matches[1:]:
+            if not len(selected):
+                break
+            selected = np.intersect1d(selected, positions, assume_unique=True)
+        return selected
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rows": int(len(self._state['canceled'])) if self._state is not None else 0,
+                "build_seconds": self._build_seconds,
+                "cache_entries": len(self._cache),
+                "hits": self._hits,
+                "misses": self._misses
+            }
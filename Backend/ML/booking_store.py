@@ -0,0 +1,70 @@
+import json
+import os
+import pandas as pd
+from Backend.ML.atomic_files import replace_atomically, write_json_atomically
+
+# Low-cardinality text columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['hotel', 'country', 'meal', 'reserved_room_type', 'customer_segment']
+# Bumped whenever the cached dtypes or derived columns change
+CACHE_VERSION = 2
+
+class BookingStore:
+    def __init__(self, source_path='Data/cleaned_hotel_bookings.csv',
+                 cache_path='Data/cache/bookings.parquet'):
+        """
+        Columnar Parquet copy of the bookings CSV with categorical dtypes and
+        the derived columns already computed. The conversion runs once per
+        change to the CSV (keyed on its size and mtime); every load after
+        that reads only the requested columns.
+        """
+        self.source_path = source_path
+        self.cache_path = cache_path
+        self.meta_path = os.path.splitext(cache_path)[0] + '.meta.json'
+
+    def fingerprint(self):
+        stat = os.stat(self.source_path)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    @staticmethod
+    def read_csv(path, columns=None):
+        """Parse the bookings CSV with the same dtypes and derived columns as the cache"""
+        df = pd.read_csv(path, dtype={column: 'category' for column in CATEGORICAL_COLUMNS})
+        df = BookingStore.add_derived_columns(df)
+        return df if columns is None else df[list(columns)]
+
+    @staticmethod
+    def add_derived_columns(df):
+        df['revenue'] = df['adr'] * (df['stays_in_weekend_nights'] + df['stays_in_week_nights'])
+        return df
+
+    def _is_fresh(self):
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return meta.get('version') == CACHE_VERSION and meta.get('fingerprint') == self.fingerprint()
+
+    def build(self):
+        """Convert the CSV to Parquet, replacing any previous cache atomically"""
+        fingerprint = self.fingerprint()
+        df = self.read_csv(self.source_path)
+        replace_atomically(self.cache_path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+        write_json_atomically(self.meta_path, {"version": CACHE_VERSION, "fingerprint": fingerprint,
+                                               "rows": int(len(df))})
+
+    def load(self, columns=None):
+        """
+        DataFrame of the requested columns (all when None), converting the
+        CSV first if the cache is missing or stale. Falls back to parsing the
+        CSV when the cache cannot be written or read.
+        """
+        try:
+            if not self._is_fresh():
+                self.build()
+            return pd.read_parquet(self.cache_path, columns=None if columns is None else list(columns))
+        except (OSError, ImportError, ValueError) as e:
+            print(f"Warning: Reading bookings CSV without the Parquet cache - {str(e)}")
+            return self.read_csv(self.source_path, columns)
@@ -0,0 +1,141 @@
+import base64
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from Backend.ML.analytics import DataAnalyzer
+from Backend.ML.metrics import ANALYTICS_CHART_SECONDS, PIPELINE_ERRORS
+
+def fig_to_base64(fig):
+    buf = BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', transparent=True)
+    return base64.b64encode(buf.getbuffer()).decode("ascii")
+
+# Per worker process, built by the pool initializer
+_worker_analyzer = None
+
+def _init_worker():
+    global _worker_analyzer
+    _worker_analyzer = DataAnalyzer()
+
+def _render_and_encode(key, results, analyzer=None):
+    """Draw and encode one chart; returns (key, png, render_ms, encode_ms)"""
+    analyzer = analyzer or _worker_analyzer
+    started = time.perf_counter()
+    fig = analyzer.render_chart(key, results)
+    rendered = time.perf_counter()
+    png = fig_to_base64(fig)
+    return key, png, 1000 * (rendered - started), 1000 * (time.perf_counter() - rendered)
+
+def _noop():
+    return None
+
+
+class ChartRenderer:
+    def __init__(self, workers=None, start_method=None, timeout=60):
+        """
+        Render and PNG-encode the dashboard charts in a pool of worker
+        processes, one chart per task, so a cold build takes about as long as
+        the slowest chart. Workers only receive the small AnalyticsResults.
+        The pool is created on the first render in each process, so a forked
+        server worker never uses a pool inherited from its parent. With
+        workers=1, or when the pool breaks or a chart takes longer than
+        timeout seconds, charts render in the caller.
+        """
+        self.workers = workers or min(len(DataAnalyzer.charts), os.cpu_count() or 1)
+        if start_method is None:
+            # The pool starts on the first render, when request, batcher and warm-up threads
+            # (and torch) may already be running; a plain fork could copy a held lock into
+            # the workers. Workers only need a DataAnalyzer, so they start from a clean process.
+            start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+        self.start_method = start_method
+        self.timeout = timeout
+        self._pool = None
+        self._pool_pid = None
+        self._local_analyzer = None
+        self._lock = threading.Lock()
+        self._builds = 0
+        self._last = None
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid != os.getpid():
+                # Inherited across a fork: its manager thread did not survive, so abandon it
+                self._pool = None
+            if self._pool is None:
+                context = mp.get_context(self.start_method)
+                if self.start_method == 'forkserver':
+                    # Workers fork from a server that has imported matplotlib and the analytics code once
+                    context.set_forkserver_preload([__name__])
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                 initializer=_init_worker)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _discard_pool(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None and self._pool_pid == os.getpid():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """Launch the worker processes now rather than on the first build"""
+        if self.workers > 1:
+            self._get_pool().submit(_noop).result()
+
+    def _render_serial(self, results):
+        if self._local_analyzer is None:
+            self._local_analyzer = DataAnalyzer()
+        return [_render_and_encode(key, results, self._local_analyzer) for key in DataAnalyzer.charts]
+
+    def render(self, results):
+        """{chart key: base64 PNG} for every chart in DataAnalyzer.charts"""
+        started = time.perf_counter()
+        mode = 'serial'
+        if self.workers > 1:
+            try:
+                pool = self._get_pool()
+                futures = [pool.submit(_render_and_encode, key, results) for key in DataAnalyzer.charts]
+                deadline = time.perf_counter() + self.timeout
+                outputs = [future.result(timeout=max(0.0, deadline - time.perf_counter())) for future in futures]
+                mode = 'processes'
+            except (BrokenProcessPool, FutureTimeoutError) as e:
+                reason = str(e) or f"no result within {self.timeout} s"
+                print(f"Warning: Chart render pool failed, rendering in-process - {reason}")
+                PIPELINE_ERRORS.inc(pipeline='analytics', stage='render_pool')
+                self._discard_pool()
+                outputs = self._render_serial(results)
+        else:
+            outputs = self._render_serial(results)
+
+        charts = {key: {'render_ms': render_ms, 'encode_ms': encode_ms}
+                  for key, _, render_ms, encode_ms in outputs}
+        for key, timing in charts.items():
+            ANALYTICS_CHART_SECONDS.observe(timing['render_ms'] / 1000, chart=key, phase='render')
+            ANALYTICS_CHART_SECONDS.observe(timing['encode_ms'] / 1000, chart=key, phase='encode')
+        self._builds += 1
+        self._last = {
+            'mode': mode,
+            'wall_ms': 1000 * (time.perf_counter() - started),
+            'sum_ms': sum(t['render_ms'] + t['encode_ms'] for t in charts.values()),
+            'charts': charts
+        }
+        return {key: png for key, png, _, _ in outputs}
+
+    def stats(self):
+        """Per-chart render/encode timings of the last build"""
+        return {
+            "workers": self.workers,
+            "start_method": self.start_method,
+            "builds": self._builds,
+            "last_build": self._last
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,100 @@
+import json
+import mmap
+import os
+import numpy as np
+from Backend.ML.atomic_files import replace_atomically, write_json_atomically
+
+class DocumentStore:
+    def __init__(self, store_dir='Data/documents'):
+        """
+        Offset-indexed document file opened with mmap, so worker processes
+        share the document pages through the OS cache instead of each
+        holding its own parsed copy
+        """
+        self.store_dir = store_dir
+        self.data_path = os.path.join(store_dir, 'documents.jsonl')
+        self.offsets_path = os.path.join(store_dir, 'offsets.npy')
+        self.ids_path = os.path.join(store_dir, 'ids.npy')
+        self.manifest_path = os.path.join(store_dir, 'manifest.json')
+        self._file = None
+        self._data = None
+        self.offsets = None
+        self._sorted_ids = None
+        self._sorted_rows = None
+
+    @staticmethod
+    def source_signature(source_path, model_name):
+        stat = os.stat(source_path)
+        return {
+            "source": os.path.abspath(source_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "model_name": model_name
+        }
+
+    def build(self, documents, ids, signature):
+        """Write documents (one JSON line each) with their row offsets and ids"""
+        offsets = np.empty(len(documents) + 1, dtype=np.int64)
+        offsets[0] = 0
+
+        def write_documents(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                for row, doc in enumerate(documents):
+                    f.write(json.dumps(doc).encode('utf-8') + b'\n')
+                    offsets[row + 1] = f.tell()
+        replace_atomically(self.data_path, write_documents)
+        for path, array in ((self.offsets_path, offsets), (self.ids_path, np.asarray(ids, dtype=np.int64))):
+            def write(tmp_path, array=array):
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, array)
+            replace_atomically(path, write)
+        # The manifest is written last and marks the store as complete
+        write_json_atomically(self.manifest_path, signature)
+
+    def is_fresh(self, signature):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f) == signature
+        except (OSError, json.JSONDecodeError):
+            return False
+
+    def open(self):
+        self.close()
+        self.offsets = np.load(self.offsets_path, mmap_mode='r')
+        ids = np.load(self.ids_path)
+        self._sorted_rows = np.argsort(ids, kind='stable')
+        self._sorted_ids = ids[self._sorted_rows]
+        self._file = open(self.data_path, 'rb')
+        if os.path.getsize(self.data_path):
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return 0 if self.offsets is None else len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self._data[start:end])
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def get_by_id(self, doc_id):
+        """Return the first document stored under the given id, or None"""
+        pos = int(np.searchsorted(self._sorted_ids, doc_id))
+        if pos < len(self._sorted_ids) and self._sorted_ids[pos] == doc_id:
+            return self[int(self._sorted_rows[pos])]
+        return None
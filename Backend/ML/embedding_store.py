@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import numpy as np
+from Backend.ML.atomic_files import replace_atomically, write_json_atomically
+
+class EmbeddingStore:
+    def __init__(self, store_dir='Data/embeddings', model_name='all-MiniLM-L6-v2', backend='torch'):
+        """
+        On-disk cache of document embeddings keyed by a hash of the
+        document text, the embedding model name and the inference backend
+        that encoded it (quantised backends give slightly different vectors)
+        """
+        self.store_dir = store_dir
+        self.model_name = model_name
+        self.backend = backend
+        # fp32 PyTorch keeps the bare model name, so existing stores stay valid
+        self.model_key = model_name if backend == 'torch' else f"{model_name}@{backend}"
+        self.keys_path = os.path.join(store_dir, 'keys.npy')
+        self.vectors_path = os.path.join(store_dir, 'vectors.npy')
+        self.meta_path = os.path.join(store_dir, 'meta.json')
+
+    def document_id(self, text):
+        """Stable positive int64 id for a document under the current model and backend"""
+        digest = hashlib.sha256(f"{self.model_key}\0{text}".encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'little') & 0x7FFFFFFFFFFFFFFF
+
+    def load(self, mmap=False):
+        """
+        Return the stored (ids, vectors), or empty arrays if nothing usable is
+        on disk. With mmap=True the vector matrix is memory-mapped read-only.
+        """
+        if not (os.path.exists(self.keys_path) and os.path.exists(self.vectors_path)):
+            return np.empty(0, dtype=np.int64), None
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get('model_name') != self.model_name or meta.get('backend', 'torch') != self.backend:
+                return np.empty(0, dtype=np.int64), None
+            ids = np.load(self.keys_path)
+            vectors = np.load(self.vectors_path, mmap_mode='r' if mmap else None)
+        except (OSError, ValueError, json.JSONDecodeError) as e:
+            print(f"Warning: Ignoring unreadable embedding store - {str(e)}")
+            return np.empty(0, dtype=np.int64), None
+        if len(ids) != len(vectors):
+            return np.empty(0, dtype=np.int64), None
+        return ids, vectors
+
+    def save(self, ids, vectors):
+        for path, array in ((self.keys_path, ids), (self.vectors_path, vectors)):
+            def write(tmp_path, array=array):
+                # Through a file object; np.save would append .npy to the temporary name
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, array)
+            replace_atomically(path, write)
+        write_json_atomically(self.meta_path, {"model_name": self.model_name, "backend": self.backend,
+                                               "dim": int(vectors.shape[1]), "count": int(len(ids))})
+
+    def sync(self, texts, encode, batch_size=32, mmap=False):
+        """
+        Bring the store in line with the given texts, encoding only new or
+        modified documents. Returns (ids, vectors, changed) with one row per
+        unique text, in first-seen order.
+        """
+        ids = []
+        unique_texts = []
+        seen = set()
+        for text in texts:
+            doc_id = self.document_id(text)
+            if doc_id not in seen:
+                seen.add(doc_id)
+                ids.append(doc_id)
+                unique_texts.append(text)
+        ids = np.array(ids, dtype=np.int64)
+
+        stored_ids, stored_vectors = self.load(mmap=mmap)
+        row_of = {int(doc_id): row for row, doc_id in enumerate(stored_ids)}
+        missing = [i for i, doc_id in enumerate(ids) if int(doc_id) not in row_of]
+
+        new_vectors = None
+        if missing:
+            batches = []
+            for start in range(0, len(missing), batch_size):
+                batch = [unique_texts[i] for i in missing[start:start + batch_size]]
+                batches.append(np.asarray(encode(batch), dtype=np.float32))
+            new_vectors = np.concatenate(batches)
+
+        if stored_vectors is not None and len(stored_vectors):
+            d = stored_vectors.shape[1]
+        else:
+            d = new_vectors.shape[1]
+        vectors = np.empty((len(ids), d), dtype=np.float32)
+        present = [i for i, doc_id in enumerate(ids) if int(doc_id) in row_of]
+        if present:
+            vectors[present] = stored_vectors[[row_of[int(ids[i])] for i in present]]
+        if missing:
+            vectors[missing] = new_vectors
+
+        # Rewrite only when documents were added or dropped
+        changed = bool(missing) or len(ids) != len(stored_ids)
+        if changed:
+            self.save(ids, vectors)
+        return ids, vectors, changed
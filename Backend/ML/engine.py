@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from Backend.ML.RagLLMs import RAGLLM
+from Backend.ML.batching import MicroBatcher
+from Backend.ML.booking_index import BookingIndex
+from Backend.ML.structured_answers import StructuredAnswerer
+
+class EngineRegistry:
+    def __init__(self, factory=RAGLLM, **engine_kwargs):
+        """
+        Hold one lazily built RAG engine per worker process so the embedder,
+        FAISS index and LLM pipeline are loaded once and shared by all requests
+        """
+        self.factory = factory
+        self.engine_kwargs = engine_kwargs
+        self._engine = None
+        self._lock = threading.Lock()
+        self._state = "cold"
+        self._error = None
+        self._load_seconds = None
+        self._warmup_thread = None
+
+    def get(self):
+        """Return the shared engine, building it on first use"""
+        engine = self._engine
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            if self._engine is None:
+                self._state = "loading"
+                self._error = None
+                started = time.perf_counter()
+                try:
+                    self._engine = self.factory(**self.engine_kwargs)
+                except Exception as e:
+                    self._state = "failed"
+                    self._error = str(e)
+                    raise
+                self._load_seconds = time.perf_counter() - started
+                self._state = "ready"
+            return self._engine
+
+    def warm_up(self, background=True):
+        """Build the engine ahead of the first request; a warm-up already running is reused"""
+        def _load():
+            try:
+                self.get()
+            except Exception as e:
+                print(f"Warning: RAG engine warm-up failed - {str(e)}")
+
+        if not background:
+            _load()
+            return None
+        thread = self._warmup_thread
+        if thread is not None and thread.is_alive():
+            return thread
+        thread = threading.Thread(target=_load, name="rag-warmup", daemon=True)
+        self._warmup_thread = thread
+        thread.start()
+        return thread
+
+    def is_ready(self):
+        return self._engine is not None
+
+    def status(self):
+        """Readiness information for health checks"""
+        return {
+            "state": self._state,
+            "ready": self.is_ready(),
+            "load_seconds": self._load_seconds,
+            "error": self._error
+        }
+
+    def reset(self):
+        """Drop the shared engine so the next request rebuilds it"""
+        with self._lock:
+            self._engine = None
+            self._state = "cold"
+            self._error = None
+            self._load_seconds = None
+
+
+def config_from_env(environ=None):
+    """Engine options taken from RAG_* environment variables"""
+    environ = os.environ if environ is None else environ
+    config = {}
+    if environ.get('RAG_STORAGE_FILE'):
+        config['storage_file'] = environ['RAG_STORAGE_FILE']
+    if environ.get('RAG_STORAGE_MODE'):
+        config['storage_mode'] = environ['RAG_STORAGE_MODE']
+    if environ.get('RAG_INDEX_TYPE'):
+        config['index_type'] = environ['RAG_INDEX_TYPE']
+    if environ.get('RAG_RETRIEVAL'):
+        config['retrieval_mode'] = environ['RAG_RETRIEVAL']
+    if environ.get('RAG_INFERENCE_BACKEND'):
+        config['inference_backend'] = environ['RAG_INFERENCE_BACKEND']
+    if environ.get('RAG_MODEL_CACHE_DIR'):
+        config['model_cache_dir'] = environ['RAG_MODEL_CACHE_DIR']
+    index_params = {}
+    for key, name in (('nlist', 'RAG_NLIST'), ('pq_m', 'RAG_PQ_M'), ('hnsw_m', 'RAG_HNSW_M'),
+                      ('nprobe', 'RAG_NPROBE'), ('ef_search', 'RAG_EF_SEARCH')):
+        if environ.get(name):
+            index_params[key] = int(environ[name])
+    if index_params:
+        config['index_params'] = index_params
+    cache_params = {}
+    for key, name, cast in (('max_entries', 'RAG_CACHE_SIZE', int), ('ttl_seconds', 'RAG_CACHE_TTL', float),
+                            ('similarity_threshold', 'RAG_CACHE_THRESHOLD', float)):
+        if environ.get(name):
+            cache_params[key] = cast(environ[name])
+    if cache_params:
+        config['cache_params'] = cache_params
+    return config
+
+
+def batch_config_from_env(environ=None):
+    """Micro-batching window for /ask taken from RAG_BATCH_* environment variables"""
+    environ = os.environ if environ is None else environ
+    return {
+        "max_batch_size": int(environ.get('RAG_BATCH_MAX_SIZE', 8)),
+        "max_wait_ms": float(environ.get('RAG_BATCH_MAX_WAIT_MS', 10))
+    }
+
+
+# Shared by /analytics/query and the structured answers of the RAG engine
+booking_index = BookingIndex()
+
+# One registry per worker process
+structured_enabled = os.environ.get('RAG_STRUCTURED_ANSWERS', '1').lower() not in ('0', 'false', 'no')
+rag_engine = EngineRegistry(structured_answerer=StructuredAnswerer(booking_index) if structured_enabled else None,
+                            **config_from_env())
+
+# Concurrent questions share one encode, one index search and one generation call.
+# Items are (message, category) pairs; category is None for unscoped questions.
+ask_batcher = MicroBatcher(
+    lambda items: rag_engine.get().process_messages([message for message, _ in items],
+                                                    [category for _, category in items]),
+    **batch_config_from_env())
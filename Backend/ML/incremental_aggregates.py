@@ -0,0 +1,173 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+from Backend.ML.analytics import AnalyticsResults, rank_counts
+from Backend.ML.atomic_files import write_json_atomically
+from Backend.ML.booking_store import BookingStore
+from Backend.ML.density import Histogram
+from Backend.ML.metrics import ANALYTICS_STAGE_SECONDS
+
+# Dimension -> how many top labels the dashboard shows (None keeps them all)
+TOP_K = {'country': 5, 'customer_segment': None, 'reserved_room_type': 3, 'meal': 3}
+SOURCE_COLUMNS = ['arrival_date', 'is_canceled', 'lead_time', 'adr',
+                  'stays_in_weekend_nights', 'stays_in_week_nights'] + list(TOP_K)
+CHECKPOINT_VERSION = 1
+
+class IncrementalAggregates:
+    def __init__(self, source_path='Data/cleaned_hotel_bookings.csv',
+                 checkpoint_path='Data/cache/aggregates.json'):
+        """
+        Running sums and counts behind the dashboard KPIs. Rows appended to
+        the bookings CSV are parsed from the last checkpointed byte offset,
+        so a refresh costs O(new rows) and a restart does not rescan history.
+        """
+        self.source_path = source_path
+        self.checkpoint_path = checkpoint_path
+        self._lock = threading.Lock()
+        self.reset()
+        self._load_checkpoint()
+
+    def reset(self):
+        self.rows = 0
+        self.canceled = 0
+        self.revenue = {}
+        self.counts = {dim: Counter() for dim in TOP_K}
+        self.lead_time = Counter()
+        self.header = None
+        self.offset = 0
+        self.signature = ''
+
+    def ingest(self, batch):
+        """Fold a DataFrame of new booking rows into the running state"""
+        if not len(batch):
+            return
+        if 'revenue' not in batch:
+            batch = BookingStore.add_derived_columns(batch.copy())
+        self.rows += len(batch)
+        self.canceled += int(batch['is_canceled'].sum())
+        for date, total in batch.groupby('arrival_date', observed=True)['revenue'].sum().items():
+            self.revenue[str(date)] = self.revenue.get(str(date), 0.0) + float(total)
+        for dim, counter in self.counts.items():
+            for label, count in batch[dim].value_counts().items():
+                if count:
+                    counter[str(label)] += int(count)
+        for days, count in batch['lead_time'].value_counts().items():
+            self.lead_time[int(days)] += int(count)
+
+    def merge(self, other):
+        """Add another instance's state, e.g. one built over a separate shard"""
+        self.rows += other.rows
+        self.canceled += other.canceled
+        for date, total in other.revenue.items():
+            self.revenue[date] = self.revenue.get(date, 0.0) + total
+        for dim, counter in other.counts.items():
+            self.counts[dim].update(counter)
+        self.lead_time.update(other.lead_time)
+
+    def results(self):
+        # Copy the state under the lock so a concurrent refresh() or reset() cannot tear it
+        with self._lock:
+            rows, canceled = self.rows, self.canceled
+            revenue = dict(self.revenue)
+            counts = {dim: dict(counter) for dim, counter in self.counts.items()}
+            lead_time = dict(self.lead_time)
+        dates = sorted(revenue)
+        return AnalyticsResults(
+            revenue_trend=pd.DataFrame({'arrival_date': dates,
+                                        'revenue': [revenue[d] for d in dates]}),
+            cancellation_rate=(canceled / rows) * 100 if rows else 0.0,
+            country_counts=self._top(counts, 'country'),
+            segment_counts=self._top(counts, 'customer_segment'),
+            room_counts=self._top(counts, 'reserved_room_type'),
+            meal_counts=self._top(counts, 'meal'),
+            lead_time=Histogram.from_counts(lead_time)
+        )
+
+    @staticmethod
+    def _top(counts, dim):
+        counter = counts[dim]
+        return rank_counts(pd.Series(list(counter.values()), index=list(counter.keys()), dtype=np.int64),
+                           TOP_K[dim])
+
+    def _tail_signature(self, f, offset):
+        # Hash of the bytes just before the offset, to notice a rewritten file
+        start = max(0, offset - 4096)
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+    def refresh(self):
+        """Ingest rows appended since the last refresh. Returns how many were added."""
+        started = time.perf_counter()
+        with self._lock:
+            added = self._refresh()
+        ANALYTICS_STAGE_SECONDS.observe(time.perf_counter() - started, stage='refresh')
+        return added
+
+    def _refresh(self):
+        with open(self.source_path, 'rb') as f:
+            header_line = f.readline()
+            header = header_line.decode('utf-8').strip().split(',')
+            size = os.fstat(f.fileno()).st_size
+            if (self.header != header or size < self.offset
+                    or self._tail_signature(f, self.offset) != self.signature):
+                # Not an append to what we ingested, start over
+                self.reset()
+                self.header = header
+                self.offset = len(header_line)
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+
+        # A writer may be mid-line, leave the partial row for the next refresh
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return 0
+        batch = pd.read_csv(io.BytesIO(chunk[:end]), header=None, names=self.header,
+                            usecols=SOURCE_COLUMNS, dtype={'arrival_date': str})
+        self.ingest(batch)
+        self.offset += end
+        with open(self.source_path, 'rb') as f:
+            self.signature = self._tail_signature(f, self.offset)
+        self._save_checkpoint()
+        return len(batch)
+
+    def _save_checkpoint(self):
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "header": self.header,
+            "offset": self.offset,
+            "signature": self.signature,
+            "rows": self.rows,
+            "canceled": self.canceled,
+            "revenue": self.revenue,
+            "counts": {dim: dict(counter) for dim, counter in self.counts.items()},
+            "lead_time": {str(days): count for days, count in self.lead_time.items()}
+        }
+        try:
+            write_json_atomically(self.checkpoint_path, state)
+        except OSError as e:
+            print(f"Warning: Failed to save aggregates checkpoint - {str(e)}")
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                state = json.load(f)
+            if state.get("version") != CHECKPOINT_VERSION:
+                return
+            self.header = state["header"]
+            self.offset = state["offset"]
+            self.signature = state["signature"]
+            self.rows = state["rows"]
+            self.canceled = state["canceled"]
+            self.revenue = state["revenue"]
+            self.counts = {dim: Counter(state["counts"].get(dim, {})) for dim in TOP_K}
+            self.lead_time = Counter({int(days): count for days, count in state["lead_time"].items()})
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Warning: Ignoring unreadable aggregates checkpoint - {str(e)}")
+            self.reset()
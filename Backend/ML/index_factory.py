@@ -0,0 +1,116 @@
+import json
+import math
+import faiss
+import numpy as np
+from Backend.ML.atomic_files import write_json_atomically
+
+INDEX_TYPES = ('flat', 'ivf_flat', 'ivf_pq', 'hnsw')
+
+def normalize(vectors):
+    """Float32 copy of the vectors scaled to unit length, so inner product is cosine"""
+    vectors = np.array(vectors, dtype=np.float32, order='C', copy=True)
+    if len(vectors):
+        faiss.normalize_L2(vectors)
+    return vectors
+
+def default_nlist(n):
+    # Roughly 4*sqrt(n) lists, keeping at least 39 training points per centroid
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+def default_pq_m(d):
+    """Largest sub-quantizer count up to 48 that divides the dimension"""
+    for m in (48, 32, 24, 16, 12, 8, 6, 4, 3, 2, 1):
+        if d % m == 0:
+            return m
+    return 1
+
+def build_index(index_type, vectors, ids, params=None):
+    """
+    Build an IndexIDMap2-wrapped index of the given type over normalised
+    vectors, training it on the corpus when the type needs it. Returns
+    (index, built_type); built_type is 'flat' when the corpus is too small
+    to train the requested IVF index.
+    """
+    params = params or {}
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}")
+    n, d = vectors.shape
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    if index_type in ('ivf_flat', 'ivf_pq') and n < 39:
+        print(f"Warning: {n} documents are too few to train {index_type}, using a flat index")
+        index_type = 'flat'
+
+    if index_type == 'flat':
+        base = faiss.IndexFlatIP(d)
+    elif index_type == 'hnsw':
+        base = faiss.IndexHNSWFlat(d, params.get('hnsw_m', 32), metric)
+        base.hnsw.efConstruction = params.get('ef_construction', 40)
+    else:
+        nlist = min(params.get('nlist') or default_nlist(n), n)
+        quantizer = faiss.IndexFlatIP(d)
+        if index_type == 'ivf_flat':
+            base = faiss.IndexIVFFlat(quantizer, d, nlist, metric)
+        else:
+            # PQ needs at least 2**nbits training points per sub-quantizer
+            nbits = min(params.get('nbits', 8), max(1, int(math.log2(n))))
+            base = faiss.IndexIVFPQ(quantizer, d, nlist, params.get('pq_m') or default_pq_m(d), nbits, metric)
+        base.train(vectors)
+
+    index = faiss.IndexIDMap2(base)
+    index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    configure_search(index, params)
+    return index, index_type
+
+def index_type_of(index):
+    """Map a loaded index back to its INDEX_TYPES name"""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    names = {
+        'IndexFlatIP': 'flat', 'IndexFlat': 'flat',
+        'IndexIVFFlat': 'ivf_flat', 'IndexIVFPQ': 'ivf_pq', 'IndexHNSWFlat': 'hnsw'
+    }
+    return names.get(type(inner).__name__)
+
+def supports_remove(index):
+    """Only flat storage keeps IndexIDMap2 ids aligned after remove_ids"""
+    return index_type_of(index) == 'flat'
+
+def configure_search(index, params=None):
+    """Apply query-time knobs (nprobe for IVF, efSearch for HNSW)"""
+    params = params or {}
+    kind = index_type_of(index)
+    if kind in ('ivf_flat', 'ivf_pq') and params.get('nprobe'):
+        faiss.extract_index_ivf(index).nprobe = int(params['nprobe'])
+    elif kind == 'hnsw' and params.get('ef_search'):
+        faiss.downcast_index(index.index).hnsw.efSearch = int(params['ef_search'])
+    return index
+
+def index_memory_bytes(index):
+    """Serialized size of the index, a close proxy for its resident memory"""
+    return int(faiss.serialize_index(index).nbytes)
+
+def meta_path(index_path):
+    return index_path + '.meta.json'
+
+def read_meta(index_path):
+    try:
+        with open(meta_path(index_path), 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _build_params(params):
+    # Search-time knobs are applied on load and do not require a rebuild
+    return {k: v for k, v in (params or {}).items() if k not in ('nprobe', 'ef_search')}
+
+def write_meta(index_path, index_type, params=None):
+    """Record the type actually built, so a flat fallback is retrained once the requested type fits"""
+    build_params = _build_params(params)
+    write_json_atomically(meta_path(index_path), {"index_type": index_type, "normalized": True,
+                                                  "params": build_params})
+
+def meta_matches(index_path, index_type, params=None):
+    build_params = _build_params(params)
+    meta = read_meta(index_path)
+    return (meta is not None and meta.get('index_type') == index_type
+            and meta.get('normalized') and meta.get('params') == build_params)
@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from Backend.ML.atomic_files import replace_atomically
+
+# torch: fp32 PyTorch (the original path)
+# int8: PyTorch with Linear layers dynamically quantised to int8 on load
+# onnx / onnx-int8: ONNX Runtime on a graph exported once and cached on disk,
+# the latter with int8 dynamically quantised weights
+BACKENDS = ('torch', 'int8', 'onnx', 'onnx-int8')
+
+GENERATOR_MODEL = "openai-community/gpt2-medium"
+ONNX_FILE = 'model.onnx'
+QUANTIZED_ONNX_FILE = 'model_quantized.onnx'
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+def hub_id(model_name):
+    """Sentence-transformers short names ('all-MiniLM-L6-v2') as Hugging Face hub ids"""
+    return model_name if '/' in model_name else f"sentence-transformers/{model_name}"
+
+def export_dir(cache_dir, model_name):
+    return os.path.join(cache_dir, 'onnx', hub_id(model_name).replace('/', '--'))
+
+def quantize_torch(model):
+    """Dynamic int8 quantisation of every Linear layer; weights are quantised once, activations per call"""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def conv1d_to_linear(model):
+    """
+    Replace GPT-2's transformers Conv1D layers (a Linear with transposed
+    weights) by nn.Linear so dynamic quantisation picks them up
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+    for name, module in list(model.named_modules()):
+        for child_name, child in list(module.named_children()):
+            if isinstance(child, Conv1D):
+                linear = torch.nn.Linear(child.weight.shape[0], child.weight.shape[1])
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(module, child_name, linear)
+    return model
+
+def ensure_onnx_export(model_cls, model_name, cache_dir, quantize=False, **export_kwargs):
+    """
+    Directory holding the exported ONNX graph and tokenizer, exporting the
+    model on first use. Returns (directory, onnx file name). Each exporting
+    worker writes to its own temporary directory and renames it into place,
+    so a crashed export is redone rather than loaded, and workers exporting
+    at once keep whichever export lands first.
+    """
+    target = export_dir(cache_dir, model_name)
+    marker = os.path.join(target, 'export.json')
+    if not os.path.exists(marker):
+        from transformers import AutoTokenizer
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(target), prefix=os.path.basename(target) + '.')
+        try:
+            model = model_cls.from_pretrained(hub_id(model_name), export=True, **export_kwargs)
+            model.save_pretrained(tmp)
+            AutoTokenizer.from_pretrained(hub_id(model_name)).save_pretrained(tmp)
+            with open(os.path.join(tmp, 'export.json'), 'w') as f:
+                json.dump({"model": hub_id(model_name), "file": ONNX_FILE}, f)
+            if os.path.isdir(target) and not os.path.exists(marker):
+                shutil.rmtree(target, ignore_errors=True)  # Incomplete export of an older version
+            try:
+                os.replace(tmp, target)
+            except OSError:
+                # Another worker's export was renamed into place first
+                if not os.path.exists(marker):
+                    raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    if not quantize:
+        return target, ONNX_FILE
+    quantized = os.path.join(target, QUANTIZED_ONNX_FILE)
+    if not os.path.exists(quantized):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        replace_atomically(quantized, lambda tmp_path: quantize_dynamic(
+            os.path.join(target, ONNX_FILE), tmp_path, weight_type=QuantType.QInt8))
+    return target, QUANTIZED_ONNX_FILE
+
+
+class OnnxEmbedder:
+    """ONNX Runtime sentence embedder with the SentenceTransformer encode signature (mean pooling, unit length)"""
+    def __init__(self, model, tokenizer, max_length=256):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+
+    def encode(self, texts, convert_to_numpy=True, batch_size=32, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                   max_length=self.max_length, return_tensors='np')
+            hidden = self.model(**batch).last_hidden_state
+            mask = batch['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            vectors.append(pooled)
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        vectors = np.concatenate(vectors).astype(np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors[0] if single else vectors
+
+
+def load_embedder(model_name, backend='torch', cache_dir='Data/models'):
+    """Sentence embedder for the given backend; anything with encode(texts, convert_to_numpy=True)"""
+    check_backend(backend)
+    if backend in ('torch', 'int8'):
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer(model_name, device='cpu' if backend == 'int8' else None)
+        return quantize_torch(embedder) if backend == 'int8' else embedder
+
+    try:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+    except ImportError as e:
+        raise RuntimeError(f"The {backend} backend needs optimum[onnxruntime]: {str(e)}")
+    from transformers import AutoTokenizer
+    path, file_name = ensure_onnx_export(ORTModelForFeatureExtraction, model_name, cache_dir,
+                                         quantize=backend == 'onnx-int8')
+    model = ORTModelForFeatureExtraction.from_pretrained(path, file_name=file_name)
+    return OnnxEmbedder(model, AutoTokenizer.from_pretrained(path))
+
+def load_generator(model_name=GENERATOR_MODEL, backend='torch', cache_dir='Data/models'):
+    """text-generation pipeline for the given backend"""
+    check_backend(backend)
+    from transformers import pipeline
+    if backend == 'torch':
+        return pipeline("text-generation", model=model_name, device_map="auto")
+    if backend == 'int8':
+        # Quantised kernels only run on CPU
+        generator = pipeline("text-generation", model=model_name, device="cpu")
+        generator.model = quantize_torch(conv1d_to_linear(generator.model))
+        return generator
+
+    try:
+        from optimum.onnxruntime import ORTModelForCausalLM
+    except ImportError as e:
+        raise RuntimeError(f"The {backend} backend needs optimum[onnxruntime]: {str(e)}")
+    from transformers import AutoTokenizer
+    path, file_name = ensure_onnx_export(ORTModelForCausalLM, model_name, cache_dir,
+                                         quantize=backend == 'onnx-int8', use_cache=True)
+    model = ORTModelForCausalLM.from_pretrained(path, file_name=file_name, use_cache=True)
+    return pipeline("text-generation", model=model, tokenizer=AutoTokenizer.from_pretrained(path))
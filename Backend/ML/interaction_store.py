@@ -0,0 +1,229 @@
+import atexit
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+class InteractionStore(ABC):
+    def __init__(self, flush_interval=1.0, max_batch=100):
+        """
+        Base class for interaction logs. Records are buffered in memory and
+        written in batches by a background thread, so a request never waits
+        on disk I/O.
+        """
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def append(self, record):
+        with self._buffer_lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.max_batch
+        self._ensure_flusher()
+        if full:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        # Started lazily so each forked worker process gets its own thread
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._buffer_lock:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._flusher = threading.Thread(target=self._run, name="interaction-flush", daemon=True)
+                    self._flusher.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write out everything buffered so far"""
+        with self._write_lock:
+            with self._buffer_lock:
+                records, self._buffer = self._buffer, []
+            if not records:
+                return
+            try:
+                self._write(records)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Storage error: {str(e)}")
+                with self._buffer_lock:
+                    self._buffer[:0] = records  # Retry on the next flush
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._wakeup.set()
+            self.flush()
+
+    @abstractmethod
+    def _write(self, records):
+        """Persist a batch of records"""
+
+    @abstractmethod
+    def page(self, offset=0, limit=50):
+        """Stored interactions, newest first, read from disk"""
+
+
+class JsonlInteractionStore(InteractionStore):
+    def __init__(self, path='Data/local_db.jsonl', max_bytes=50 * 2**20, backups=5, **kwargs):
+        """
+        Append-only JSON Lines log. Writers in different processes take an
+        exclusive flock on a sidecar lock file, and the log is rotated to
+        path.1 ... path.N once it reaches max_bytes.
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.lock_path = path + '.lock'
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def locked(self):
+        """Hold the exclusive flock shared by every process writing this log"""
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write(self, records):
+        with self.locked():
+            self._append(records)
+
+    def _append(self, records):
+        """Write records to the log; the caller holds the lock"""
+        payload = ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        with open(self.path, 'ab') as f:
+            f.write(payload)
+
+    def _rotate(self):
+        for n in range(self.backups, 0, -1):
+            source = self.path if n == 1 else f"{self.path}.{n - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{n}")
+
+    def _files_newest_first(self):
+        paths = [self.path] + [f"{self.path}.{n}" for n in range(1, self.backups + 1)]
+        return [p for p in paths if os.path.exists(p)]
+
+    @staticmethod
+    def _lines_reversed(path, block_size=64 * 1024):
+        """Yield the lines of a file from last to first without reading it whole"""
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            tail = b''
+            while position > 0:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                lines = (f.read(step) + tail).split(b'\n')
+                tail = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield line
+            if tail.strip():
+                yield tail
+
+    def page(self, offset=0, limit=50):
+        self.flush()
+        records = []
+        skipped = 0
+        for path in self._files_newest_first():
+            for line in self._lines_reversed(path):
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # Torn line from a crashed writer
+                if len(records) >= limit:
+                    return records
+        return records
+
+
+class SqliteInteractionStore(InteractionStore):
+    def __init__(self, path='Data/local_db.sqlite', **kwargs):
+        """SQLite log in WAL mode, safe for concurrent writers in several processes"""
+        super().__init__(**kwargs)
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS interactions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, record TEXT NOT NULL)"
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, records):
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT INTO interactions (timestamp, record) VALUES (?, ?)",
+                [(record.get("timestamp"), json.dumps(record)) for record in records]
+            )
+
+    def page(self, offset=0, limit=50):
+        self.flush()
+        rows = self._connection().execute(
+            "SELECT record FROM interactions ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+def _import_legacy_json(legacy_path, store):
+    """Carry over a whole-list local_db.json written by older versions; the caller holds store's lock"""
+    try:
+        with open(legacy_path, 'r') as f:
+            records = json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"Warning: Failed to import legacy storage - {str(e)}")
+        return
+    if isinstance(records, list) and records:
+        store._append(records)
+
+def open_interaction_store(path, **kwargs):
+    """Pick the backend from the file extension (.sqlite/.db or JSON Lines)"""
+    if path.endswith(('.sqlite', '.sqlite3', '.db')):
+        return SqliteInteractionStore(path, **kwargs)
+
+    # The whole-list local_db.json of older versions sits next to the .jsonl log
+    if path.endswith('.json'):
+        legacy_path, path = path, path + 'l'
+    else:
+        legacy_path = path[:-1] if path.endswith('.jsonl') else None
+    store = JsonlInteractionStore(path, **kwargs)
+    if legacy_path and os.path.exists(legacy_path):
+        # Under the log's lock, so workers starting together import it only once
+        with store.locked():
+            if not os.path.exists(path):
+                _import_legacy_json(legacy_path, store)
+    return store
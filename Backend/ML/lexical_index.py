@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import numpy as np
+from Backend.ML.atomic_files import replace_atomically, write_json_atomically
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    """Lower-case alphanumeric tokens; single letters and codes such as 'bb' or 'prt' are kept"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Merge ranked id lists by summing 1 / (k + rank); best first"""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class LexicalIndex:
+    def __init__(self, store_dir, k1=1.5, b=0.75):
+        """
+        BM25 inverted index over the document texts, stored as CSR arrays
+        (per-term offsets into row/term-frequency postings) next to the FAISS
+        index. Document ids are the same content-hash ids FAISS uses, and each
+        document's metadata category is kept for filtering.
+        """
+        self.store_dir = store_dir
+        self.k1 = k1
+        self.b = b
+        self.manifest_path = os.path.join(store_dir, 'manifest.json')
+        self.vocab = {}
+        self.categories = []
+        self.arrays = {}
+
+    @staticmethod
+    def source_signature(source_path, model_key):
+        """model_key names the document id scheme (EmbeddingStore.model_key) the index was built with"""
+        stat = os.stat(source_path)
+        return {"source": os.path.abspath(source_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "model_key": model_key}
+
+    def _path(self, name):
+        return os.path.join(self.store_dir, f'{name}.npy')
+
+    def build(self, ids, texts, categories, signature):
+        """Index the documents and write the index, replacing any previous one"""
+        vocab = {}
+        doc_terms = []
+        doc_len = np.empty(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[row] = len(tokens)
+            counts = {}
+            for token in tokens:
+                term = vocab.setdefault(token, len(vocab))
+                counts[term] = counts.get(term, 0) + 1
+            doc_terms.append(counts)
+
+        # Group (term, row, tf) triples by term into CSR postings
+        terms = np.fromiter((t for counts in doc_terms for t in counts), dtype=np.int64)
+        rows = np.fromiter((row for row, counts in enumerate(doc_terms) for _ in counts), dtype=np.int32)
+        tfs = np.fromiter((tf for counts in doc_terms for tf in counts.values()), dtype=np.float32)
+        order = np.argsort(terms, kind='stable')
+        offsets = np.searchsorted(terms[order], np.arange(len(vocab) + 1)).astype(np.int64)
+
+        category_names = sorted({str(c) for c in categories})
+        code_of = {name: code for code, name in enumerate(category_names)}
+        self.vocab = vocab
+        self.categories = category_names
+        self.arrays = {
+            'ids': np.asarray(ids, dtype=np.int64),
+            'doc_len': doc_len,
+            'offsets': offsets,
+            'rows': rows[order],
+            'tfs': tfs[order],
+            'category_codes': np.array([code_of[str(c)] for c in categories], dtype=np.int32)
+        }
+        self._save(signature)
+        return self
+
+    def _save(self, signature):
+        for name, array in self.arrays.items():
+            def write(tmp_path, array=array):
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, array)
+            replace_atomically(self._path(name), write)
+        write_json_atomically(os.path.join(self.store_dir, 'vocab.json'),
+                              {"terms": list(self.vocab), "categories": self.categories})
+        # The manifest is written last and marks the index as complete
+        write_json_atomically(self.manifest_path, signature)
+
+    def is_fresh(self, signature):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f) == signature
+        except (OSError, json.JSONDecodeError):
+            return False
+
+    def load(self, mmap=False):
+        with open(os.path.join(self.store_dir, 'vocab.json'), 'r') as f:
+            stored = json.load(f)
+        self.vocab = {term: i for i, term in enumerate(stored["terms"])}
+        self.categories = stored["categories"]
+        self.arrays = {name: np.load(self._path(name), mmap_mode='r' if mmap else None)
+                       for name in ('ids', 'doc_len', 'offsets', 'rows', 'tfs', 'category_codes')}
+        return self
+
+    def __len__(self):
+        return len(self.arrays.get('ids', ()))
+
+    def known_terms(self, query):
+        return [token for token in tokenize(query) if token in self.vocab]
+
+    def search(self, query, top_k=5, category=None):
+        """(ids, scores) of the best BM25 matches, optionally within one metadata category"""
+        a = self.arrays
+        n = len(a['ids'])
+        terms = {self.vocab[token] for token in self.known_terms(query)}
+        if not n or not terms:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        avg_len = float(np.mean(a['doc_len']))
+        scores = np.zeros(n, dtype=np.float32)
+        for term in terms:
+            start, end = a['offsets'][term], a['offsets'][term + 1]
+            rows, tfs = a['rows'][start:end], a['tfs'][start:end]
+            idf = np.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * a['doc_len'][rows] / avg_len)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        if category is not None:
+            if category not in self.categories:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            scores[a['category_codes'] != self.categories.index(category)] = 0
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind='stable')]
+        return np.asarray(a['ids'][matched]), scores[matched]
@@ -0,0 +1,193 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; stages range from sub-millisecond lookups to multi-second generations
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames) or set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """(sample name, labels, value) for every label combination"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the with block, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, {'counts': list(s['counts']), 'sum': s['sum'], 'count': s['count']})
+                     for key, s in self._values.items()]
+        for key, state in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['counts']):
+                cumulative += count
+                yield self.name + '_bucket', {**labels, 'le': _format_value(float(bound))}, cumulative
+            yield self.name + '_bucket', {**labels, 'le': '+Inf'}, state['count']
+            yield self.name + '_sum', labels, state['sum']
+            yield self.name + '_count', labels, state['count']
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        In-process metrics rendered in the Prometheus text exposition format.
+        Collectors are called at scrape time for figures other components
+        already keep (cache hit ratios, queue depths); each returns
+        (name, documentation, labels, value) gauge samples.
+        """
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collect):
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}"
+                         for name, labels, value in metric.samples())
+
+        collected = {}
+        for collect in collectors:
+            try:
+                for name, documentation, labels, value in collect():
+                    collected.setdefault(name, (documentation, []))[1].append((labels, value))
+            except Exception as e:
+                print(f"Warning: Metrics collector failed - {str(e)}")
+        for name, (documentation, samples) in collected.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+
+# One registry per worker process, scraped at /metrics
+REGISTRY = MetricsRegistry()
+
+RAG_STAGE_SECONDS = REGISTRY.histogram(
+    'rag_stage_seconds', 'Time spent in each RAG pipeline stage per call (batched calls cover the whole batch)',
+    ['stage'])
+RAG_ANSWERS = REGISTRY.counter(
+    'rag_answers_total', 'Answers by how they were produced', ['source'])
+RAG_TOKENS = REGISTRY.histogram(
+    'rag_tokens', 'Prompt and generated token counts per answer', ['kind'],
+    buckets=(8, 16, 32, 64, 128, 256, 512, 1024, 2048))
+RAG_TTFT_SECONDS = REGISTRY.histogram(
+    'rag_ttft_seconds', 'Time to the first answer text of /ask/stream, by how the answer was produced', ['source'])
+RAG_RETRIEVAL_SCORE = REGISTRY.histogram(
+    'rag_retrieval_score', 'Best score per query: cosine similarity for dense, BM25 for lexical', ['retriever'],
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 2.5, 5.0, 10.0, 20.0))
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    'rag_model_load_seconds', 'Time taken to load each model or index of the RAG engine', ['component'])
+ANALYTICS_STAGE_SECONDS = REGISTRY.histogram(
+    'analytics_stage_seconds', 'Time spent in each analytics pipeline stage', ['stage'])
+ANALYTICS_CHART_SECONDS = REGISTRY.histogram(
+    'analytics_chart_seconds', 'Render and PNG encode time per chart', ['chart', 'phase'])
+PIPELINE_ERRORS = REGISTRY.counter(
+    'pipeline_errors_total', 'Failures that were logged and fell back', ['pipeline', 'stage'])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_seconds', 'Request handling time by endpoint and status', ['endpoint', 'method', 'status'])
@@ -0,0 +1,175 @@
+import calendar
+import re
+from Backend.ML.booking_index import BookingIndex
+
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+
+# Words that only phrase the question or name a metric; anything else must be a recognised filter
+QUESTION_WORDS = {
+    'what', 'whats', 's', 'is', 'was', 'were', 'are', 'the', 'a', 'an', 'of', 'for', 'in', 'from', 'by',
+    'how', 'many', 'much', 'did', 'do', 'does', 'there', 'our', 'we', 'have', 'has', 'had', 'please',
+    'tell', 'me', 'show', 'give', 'which', 'overall', 'all', 'total', 'number', 'count', 'guests', 'guest',
+    'customers', 'customer', 'booking', 'bookings', 'reservation', 'reservations', 'made', 'during', 'year',
+    'cancel', 'cancelled', 'canceled', 'cancellation', 'cancellations', 'rate', 'percentage', 'percent',
+    'ratio', 'revenue', 'top', 'most', 'popular', 'common', 'countries', 'country', 'segments', 'segment',
+    'room', 'rooms', 'type', 'types', 'meal', 'meals', 'plan', 'plans'
+}
+
+class StructuredAnswerer:
+    def __init__(self, index=None):
+        """
+        Answer numeric questions the bookings table can settle exactly
+        ("cancellation rate for PRT in 2016", "how many bookings in March
+        2017", "total revenue for City Hotel") with a BookingIndex lookup.
+        answer() returns None for anything else so the caller falls back to
+        retrieval and generation.
+        """
+        self.index = index or BookingIndex()
+        self._unavailable = False
+
+    def detect_metric(self, query):
+        q = query.lower()
+        if 'cancel' in q:
+            if any(term in q for term in ('rate', 'percentage', 'percent', '%', 'ratio')):
+                return 'cancellation_rate'
+            if re.search(r'\b(how many|number of|count)\b', q):
+                return 'cancellations'
+            return None
+        if any(term in q for term in ('top', 'most', 'which')):
+            for term, metric in (('countr', 'top_countries'), ('segment', 'top_segments'),
+                                 ('room', 'top_rooms'), ('meal', 'top_meals')):
+                if term in q:
+                    return metric
+        if 'revenue' in q and any(term in q for term in ('total', 'how much', 'what', 'revenue for', 'revenue in')):
+            return 'revenue'
+        if re.search(r'\b(how many|number of|count|total)\b', q) and \
+                any(term in q for term in ('booking', 'reservation')):
+            return 'bookings'
+        return None
+
+    def extract_filters(self, query):
+        """
+        Date range and dimension labels named in the query. Raises
+        ValueError for an upper-case code that matches no country or meal,
+        and for more than one year, which may be a comparison rather than a
+        range.
+        """
+        q = query.lower()
+        filters = {}
+
+        month = re.search(r'\b(' + '|'.join(MONTHS) + r')\s+(20\d{2})\b', q)
+        years = sorted({int(y) for y in re.findall(r'\b(20\d{2})\b', q)})
+        if len(years) > 1:
+            raise ValueError(f"Several years: {', '.join(map(str, years))}")
+        if month:
+            number, year = MONTHS[month.group(1)], int(month.group(2))
+            filters['start'] = f"{year:04d}-{number:02d}-01"
+            filters['end'] = f"{year:04d}-{number:02d}-{calendar.monthrange(year, number)[1]:02d}"
+        elif years:
+            filters['start'] = f"{years[0]:04d}-01-01"
+            filters['end'] = f"{years[0]:04d}-12-31"
+
+        # Country and meal codes are only taken when written in upper case
+        codes = set(re.findall(r'\b[A-Z]{2,3}\b', query))
+        for dim in ('country', 'meal'):
+            labels = [label for label in self.index.labels(dim) if label in codes]
+            if labels:
+                filters[dim] = labels
+            codes -= set(labels)
+        if codes:
+            # A code we cannot resolve would silently widen the answer
+            raise ValueError(f"Unrecognised codes: {', '.join(sorted(codes))}")
+        for dim in ('hotel', 'customer_segment'):
+            labels = [label for label in self.index.labels(dim)
+                      if re.search(r'\b' + re.escape(label.lower()) + r'\b', q)]
+            if labels:
+                filters[dim] = labels
+        room = re.search(r'\broom(?:\s+type)?\s+([a-z])\b', q)
+        if room and room.group(1).upper() in self.index.labels('reserved_room_type'):
+            filters['reserved_room_type'] = [room.group(1).upper()]
+        return filters
+
+    @staticmethod
+    def unaccounted_words(query, filters):
+        """
+        Words of the query that are neither question phrasing nor one of the
+        recognised filters, such as a country name, a numeric condition
+        ("over 100 days", "2 adults") or a comparison ("higher than")
+        """
+        known = set(QUESTION_WORDS)
+        for dim, labels in filters.items():
+            if dim in ('start', 'end'):
+                continue
+            for label in labels:
+                known.update(re.findall(r'[a-z]+|\d+', label.lower()))
+        if 'start' in filters:
+            known.add(filters['start'][:4])
+            if filters['start'][5:7] == filters['end'][5:7]:
+                known.add(calendar.month_name[int(filters['start'][5:7])].lower())
+        return [word for word in re.findall(r'[a-z]+|\d+', query.lower()) if word not in known]
+
+    @staticmethod
+    def describe(filters):
+        parts = []
+        if 'hotel' in filters:
+            parts.append(' and '.join(filters['hotel']))
+        if 'country' in filters:
+            parts.append('guests from ' + ', '.join(filters['country']))
+        if 'customer_segment' in filters:
+            parts.append(', '.join(filters['customer_segment']) + ' customers')
+        if 'reserved_room_type' in filters:
+            parts.append('room type ' + ', '.join(filters['reserved_room_type']))
+        if 'meal' in filters:
+            parts.append('meal plan ' + ', '.join(filters['meal']))
+        scope = ' for ' + ', '.join(parts) if parts else ''
+        if 'start' in filters:
+            start, end = filters['start'], filters['end']
+            if start[5:7] == end[5:7]:
+                scope += f" in {calendar.month_name[int(start[5:7])]} {start[:4]}"
+            else:
+                scope += f" in {start[:4]}"
+        return scope or ' overall'
+
+    def answer(self, query):
+        """(response, details) for a structured question, or None"""
+        if self._unavailable:
+            return None
+        metric = self.detect_metric(query)
+        if metric is None:
+            return None
+        try:
+            filters = self.extract_filters(query)
+            # Two labels of one dimension may be a comparison; a word we cannot
+            # place may be a condition. Either way the lookup would not be exact.
+            if any(len(labels) > 1 for dim, labels in filters.items() if dim not in ('start', 'end')):
+                return None
+            if self.unaccounted_words(query, filters):
+                return None
+            result = self.index.query(filters)
+        except OSError as e:
+            # No bookings table on this host, stop trying
+            print(f"Warning: Structured answers disabled - {str(e)}")
+            self._unavailable = True
+            return None
+        except ValueError:
+            return None
+
+        scope = self.describe(filters)
+        rows = result['rows']
+        if not rows:
+            response = f"There are no bookings{scope}."
+        elif metric == 'cancellation_rate':
+            response = (f"The cancellation rate{scope} is {result['cancellation_rate']:.2f}% "
+                        f"({result['canceled']:,} of {rows:,} bookings were cancelled).")
+        elif metric == 'cancellations':
+            response = f"There were {result['canceled']:,} cancelled bookings{scope}, out of {rows:,}."
+        elif metric == 'bookings':
+            response = f"There were {rows:,} bookings{scope}."
+        elif metric == 'revenue':
+            response = f"The total revenue{scope} is {result['total_revenue']:,.2f}."
+        else:
+            key = metric.split('_', 1)[1]
+            listed = ', '.join(f"{label} ({count:,})" for label, count in
+                               zip(result[key]['labels'], result[key]['counts']))
+            response = f"The top {key}{scope} by bookings are {listed}."
+        return response, {"metric": metric, "filters": result['filters'], "rows": rows}
@@ -0,0 +1,83 @@
+"""
+Figure count and memory over repeated /analytics builds.
+
+Renders and encodes the full dashboard --iterations times from a synthetic
+bookings CSV, as build_analytics_payload does for every /analytics snapshot,
+and fails when pyplot holds any figure, when Figure objects survive garbage
+collection, or when RSS grows by more than --max-growth-mb after warm-up.
+
+    python -m Benchmarks.analytics_leak --iterations 1000
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from Benchmarks.synthetic import make_bookings
+from Backend.ML.analytics import DataAnalyzer
+from Backend.ML.chart_renderer import fig_to_base64
+from Backend.ML.incremental_aggregates import IncrementalAggregates
+
+def rss_mb():
+    """Resident set size from /proc (Linux only)"""
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def live_figures():
+    # The last closed figure is only freed by a second pass (its finalizers run in the first)
+    for _ in range(5):
+        if not gc.collect():
+            break
+    return sum(isinstance(obj, Figure) for obj in gc.get_objects())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=20, help='Builds before the RSS baseline is taken')
+    parser.add_argument('--max-growth-mb', type=float, default=30.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        csv_path = os.path.join(root, 'cleaned_hotel_bookings.csv')
+        make_bookings(args.rows).to_csv(csv_path, index=False)
+        aggregates = IncrementalAggregates(csv_path, os.path.join(root, 'aggregates.json'))
+
+        failures = []
+        baseline = None
+        started = time.perf_counter()
+        for i in range(1, args.iterations + 1):
+            aggregates.refresh()
+            DataAnalyzer(aggregates=aggregates).generate_encoded_analytics(encode=fig_to_base64)
+            if plt.get_fignums():
+                failures.append(f"build {i}: pyplot holds figures {plt.get_fignums()}")
+                break
+            if i == args.warmup:
+                gc.collect()
+                baseline = rss_mb()
+            if i % 100 == 0 or i == args.iterations:
+                print(f"{i:>6} builds  RSS {rss_mb():8.1f} MB  {(time.perf_counter() - started) / i * 1000:7.1f} ms/build")
+
+    figures = live_figures()
+    growth = rss_mb() - baseline if baseline is not None else 0.0
+    print(f"live Figure objects {figures}  RSS growth after warm-up {growth:.1f} MB")
+    if figures:
+        failures.append(f"{figures} Figure objects survived garbage collection")
+    if growth > args.max_growth_mb:
+        failures.append(f"RSS grew {growth:.1f} MB (limit {args.max_growth_mb} MB)")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("figure count and RSS flat ok")
+
+if __name__ == '__main__':
+    main()
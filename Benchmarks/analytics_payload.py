@@ -0,0 +1,68 @@
+"""
+Size and server time of the PNG /analytics payload against /analytics/data.
+
+Builds both payloads from the same synthetic bookings CSV: six base64 PNGs
+rendered by matplotlib (in the request thread and in the ChartRenderer
+process pool, with per-chart timings), and the JSON aggregates the browser
+draws from, with and without LTTB downsampling of the revenue series.
+
+    python -m Benchmarks.analytics_payload --rows 1000000 --points 500
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from Benchmarks.synthetic import make_bookings
+from Backend.ML.analytics import DataAnalyzer
+from Backend.ML.chart_renderer import ChartRenderer, fig_to_base64
+from Backend.ML.incremental_aggregates import IncrementalAggregates
+
+def timed(build, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = build()
+        best = min(best, time.perf_counter() - started)
+    return best, len(json.dumps(payload).encode('utf-8'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--points', type=int, default=500, help='LTTB target for the revenue series')
+    parser.add_argument('--workers', type=int, help='Render processes (default: one per chart, up to the CPU count)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        csv_path = os.path.join(root, 'cleaned_hotel_bookings.csv')
+        make_bookings(args.rows).to_csv(csv_path, index=False)
+        aggregates = IncrementalAggregates(csv_path, os.path.join(root, 'aggregates.json'))
+        aggregates.refresh()
+        analyzer = DataAnalyzer(aggregates=aggregates)
+        renderer = ChartRenderer(args.workers)
+        renderer.start()
+
+        report = []
+        for name, build in (('png', lambda: analyzer.generate_encoded_analytics(fig_to_base64)),
+                            ('png_pool', lambda: analyzer.generate_encoded_analytics(renderer=renderer)),
+                            ('data', lambda: analyzer.generate_data()),
+                            ('data_lttb', lambda: analyzer.generate_data(args.points))):
+            seconds, size = timed(build, args.repeat)
+            report.append({'payload': name, 'rows': args.rows, 'build_s': seconds, 'bytes': size})
+            print(f"{name:<10} build {seconds * 1000:9.2f} ms  payload {size / 1024:9.1f} KiB")
+        renderer.shutdown()
+
+        last = renderer.stats()['last_build']
+        report.append({'payload': 'png_pool_charts', **last})
+        for key, timing in last['charts'].items():
+            print(f"  {key:<17} render {timing['render_ms']:8.2f} ms  encode {timing['encode_ms']:8.2f} ms")
+        print(f"  pool wall {last['wall_ms']:.2f} ms against {last['sum_ms']:.2f} ms summed")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
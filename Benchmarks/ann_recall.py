@@ -0,0 +1,89 @@
+"""
+Recall, speed and memory of the retrieval index types.
+
+Builds every index type from Backend.ML.index_factory over the same vectors,
+sweeps nprobe/efSearch and reports recall@k against the exact flat index,
+single-query latency, batched QPS, build time and index size.
+
+    python -m Benchmarks.ann_recall --size 1000000
+    python -m Benchmarks.ann_recall --vectors Data/embeddings/vectors.npy
+"""
+import argparse
+import json
+import time
+import numpy as np
+from Benchmarks.synthetic import make_clustered_embeddings
+from Backend.ML import index_factory
+
+SWEEPS = {
+    'flat': [{}],
+    'ivf_flat': [{'nprobe': p} for p in (1, 4, 16, 64)],
+    'ivf_pq': [{'nprobe': p} for p in (1, 4, 16, 64)],
+    'hnsw': [{'ef_search': ef} for ef in (16, 64, 256)]
+}
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / (k * len(truth))
+
+def time_search(index, queries, k):
+    started = time.perf_counter()
+    index.search(queries, k)
+    batch_seconds = time.perf_counter() - started
+
+    latencies = []
+    for query in queries[:200]:
+        started = time.perf_counter()
+        index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+    return len(queries) / batch_seconds, float(np.median(latencies) * 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=100_000, help='Synthetic corpus size')
+    parser.add_argument('--vectors', help='Use a stored .npy embedding matrix instead of synthetic vectors')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = index_factory.normalize(np.load(args.vectors, mmap_mode='r'))
+    else:
+        vectors = make_clustered_embeddings(args.size)
+    ids = np.arange(len(vectors), dtype=np.int64)
+
+    # Queries are perturbed corpus vectors, like paraphrased questions
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(len(vectors), size=args.queries)]
+    queries = index_factory.normalize(queries + 0.05 * rng.standard_normal(queries.shape, dtype=np.float32))
+
+    exact, _ = index_factory.build_index('flat', vectors, ids)
+    _, truth = exact.search(queries, args.k)
+
+    report = []
+    for index_type, sweep in SWEEPS.items():
+        started = time.perf_counter()
+        index, _ = index_factory.build_index(index_type, vectors, ids)
+        build_seconds = time.perf_counter() - started
+        memory_mb = index_factory.index_memory_bytes(index) / 2**20
+        for params in sweep:
+            index_factory.configure_search(index, params)
+            _, found = index.search(queries, args.k)
+            qps, p50_ms = time_search(index, queries, args.k)
+            row = {
+                'index_type': index_type, **params, 'recall_at_k': recall_at_k(found, truth),
+                'qps': qps, 'p50_ms': p50_ms, 'build_seconds': build_seconds, 'memory_mb': memory_mb
+            }
+            report.append(row)
+            knob = ', '.join(f"{k}={v}" for k, v in params.items()) or '-'
+            print(f"{index_type:<9} {knob:<14} recall@{args.k} {row['recall_at_k']:.3f}  "
+                  f"{qps:10.0f} QPS  p50 {p50_ms:7.3f} ms  build {build_seconds:7.1f} s  {memory_mb:8.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'size': len(vectors), 'k': args.k, 'results': report}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Load time and DataFrame memory of the bookings CSV against the Parquet cache.
+
+Writes a synthetic bookings CSV per size and compares the old default-dtype
+CSV parse, the one-off Parquet conversion, a full cache load and a load of
+only the columns the dashboard charts read.
+
+    python -m Benchmarks.booking_load --sizes 100000 1000000 10000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import pandas as pd
+from Benchmarks.synthetic import make_bookings
+from Backend.ML.analytics import DataAnalyzer
+from Backend.ML.booking_store import BookingStore
+
+def chart_columns():
+    return list(dict.fromkeys(c for cols in DataAnalyzer.chart_columns.values() for c in cols))
+
+def timed(load, repeat):
+    """Best wall time over repeat runs and the deep memory of the last frame"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = load()
+        best = min(best, time.perf_counter() - started)
+    return best, df.memory_usage(deep=True).sum() / 2**20
+
+def default_csv(path):
+    # What DataAnalyzer._load_data did before the cache
+    df = pd.read_csv(path)
+    df['revenue'] = df['adr'] * (df['stays_in_weekend_nights'] + df['stays_in_week_nights'])
+    return df
+
+def measure(root, n, repeat):
+    csv_path = os.path.join(root, 'cleaned_hotel_bookings.csv')
+    make_bookings(n).to_csv(csv_path, index=False)
+    store = BookingStore(csv_path, os.path.join(root, 'cache', 'bookings.parquet'))
+
+    started = time.perf_counter()
+    store.build()
+    build_seconds = time.perf_counter() - started
+
+    rows = []
+    for name, load in (('csv', lambda: default_csv(csv_path)),
+                       ('parquet', lambda: store.load()),
+                       ('parquet_charts', lambda: store.load(chart_columns()))):
+        seconds, memory_mb = timed(load, repeat)
+        rows.append({'rows': n, 'source': name, 'load_s': seconds, 'memory_mb': memory_mb})
+    rows[1]['build_s'] = build_seconds
+    rows[1]['file_mb'] = os.path.getsize(store.cache_path) / 2**20
+    rows[0]['file_mb'] = os.path.getsize(csv_path) / 2**20
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+
+    report = []
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as root:
+            for row in measure(root, n, args.repeat):
+                report.append(row)
+                print(f"{n:>11,} rows  {row['source']:<15} load {row['load_s']:8.3f} s  "
+                      f"DataFrame {row['memory_mb']:9.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Histogram/FFT density estimate against the seaborn KDE it replaced.
+
+For each size it times sns.kdeplot over the raw column and the NumPy path
+(histogram once, then kde()), and reports the largest difference between
+the two curves relative to the seaborn peak. lead_time uses one bin per day;
+adr and stay length show the same estimator on other columns.
+
+    python -m Benchmarks.density --sizes 10000 100000 1000000 10000000
+"""
+import argparse
+import json
+import time
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+from Benchmarks.synthetic import make_bookings
+from Backend.ML.density import Histogram, kde
+
+# Column -> histogram bin width
+COLUMNS = {'lead_time': 1, 'adr': 0.5, 'stay_length': 1}
+
+def seaborn_curve(values):
+    fig, ax = plt.subplots()
+    try:
+        started = time.perf_counter()
+        sns.kdeplot(x=values, ax=ax)
+        seconds = time.perf_counter() - started
+        x, y = ax.lines[0].get_xydata().T
+    finally:
+        plt.close(fig)
+    return x, y, seconds
+
+def numpy_curve(values, width):
+    started = time.perf_counter()
+    hist = Histogram.from_values(values, width)
+    hist_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    x, y = kde(hist)
+    return x, y, hist_seconds, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+
+    report = []
+    for n in args.sizes:
+        bookings = make_bookings(n)
+        bookings['stay_length'] = bookings['stays_in_weekend_nights'] + bookings['stays_in_week_nights']
+        for column, width in COLUMNS.items():
+            values = bookings[column].to_numpy()
+            sx, sy, sns_seconds = seaborn_curve(values)
+            x, y, hist_seconds, kde_seconds = numpy_curve(values, width)
+            error = float(np.max(np.abs(np.interp(sx, x, y) - sy)) / sy.max())
+            row = {'rows': n, 'column': column, 'seaborn_s': sns_seconds,
+                   'histogram_s': hist_seconds, 'kde_s': kde_seconds, 'max_rel_error': error}
+            report.append(row)
+            print(f"{n:>11,} rows  {column:<12} seaborn {sns_seconds * 1000:10.1f} ms  "
+                  f"histogram {hist_seconds * 1000:7.1f} ms  kde {kde_seconds * 1000:6.2f} ms  "
+                  f"max error {error:.2e}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Filtered KPI queries through BookingIndex against pandas boolean masks.
+
+Generates random filters (date range plus up to three dimensions), checks
+every BookingIndex result against the same KPIs computed with masks over
+the full DataFrame, and reports the latency of both, cold and cached.
+
+    python -m Benchmarks.filtered_analytics --rows 1000000 --queries 200
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from Benchmarks.synthetic import make_bookings
+from Backend.ML.analytics import rank_counts
+from Backend.ML.booking_index import DIMENSIONS, BookingIndex, normalize_filters
+from Backend.ML.booking_store import BookingStore
+
+def random_filters(df, rng):
+    dates = np.sort(df['arrival_date'].unique())
+    start, end = np.sort(rng.choice(len(dates), size=2, replace=False))
+    filters = {'start': dates[start], 'end': dates[end]}
+    for dim in rng.choice(list(DIMENSIONS), size=rng.integers(0, 4), replace=False):
+        labels = df[dim].astype(str).unique()
+        filters[dim] = list(rng.choice(labels, size=rng.integers(1, 3), replace=False))
+    return filters
+
+def masked(df, filters):
+    """The per-request pandas path the index replaces"""
+    normalized = normalize_filters(filters)
+    mask = np.ones(len(df), dtype=bool)
+    if 'start' in normalized:
+        mask &= (df['arrival_date'] >= normalized['start']).to_numpy()
+    if 'end' in normalized:
+        mask &= (df['arrival_date'] <= normalized['end']).to_numpy()
+    for dim in DIMENSIONS:
+        if dim in normalized:
+            mask &= df[dim].astype(str).isin(normalized[dim]).to_numpy()
+    subset = df[mask]
+    trend = subset.groupby('arrival_date')['revenue'].sum()
+    result = {
+        'rows': len(subset),
+        'cancellation_rate': round(100 * int(subset['is_canceled'].sum()) / len(subset), 2) if len(subset) else 0.0,
+        'revenue': {'dates': trend.index.astype(str).tolist(), 'values': [round(float(v), 2) for v in trend]}
+    }
+    for dim, (output_key, k) in DIMENSIONS.items():
+        ranked = rank_counts(subset[dim].astype(str).value_counts(), k)
+        result[output_key] = {'labels': ranked.index.tolist(), 'counts': ranked.tolist()}
+    return result
+
+def assert_same(indexed, expected):
+    for key, value in expected.items():
+        if key == 'revenue':
+            assert indexed[key]['dates'] == value['dates']
+            assert np.allclose(indexed[key]['values'], value['values'], atol=0.011)
+        else:
+            assert indexed[key] == value, key
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as root:
+        csv_path = os.path.join(root, 'cleaned_hotel_bookings.csv')
+        make_bookings(args.rows).to_csv(csv_path, index=False)
+        store = BookingStore(csv_path, os.path.join(root, 'cache', 'bookings.parquet'))
+        df = store.load()
+        df['arrival_date'] = df['arrival_date'].astype(str)
+
+        index = BookingIndex(store)
+        started = time.perf_counter()
+        index.query({})
+        build_seconds = time.perf_counter() - started
+
+        timings = {'pandas': [], 'index': [], 'index_cached': []}
+        for _ in range(args.queries):
+            filters = random_filters(df, rng)
+            started = time.perf_counter()
+            expected = masked(df, filters)
+            timings['pandas'].append(time.perf_counter() - started)
+            for name in ('index', 'index_cached'):
+                started = time.perf_counter()
+                result = index.query(filters)
+                timings[name].append(time.perf_counter() - started)
+            assert_same(result, expected)
+
+    report = {'rows': args.rows, 'queries': args.queries, 'build_s': build_seconds}
+    print(f"{args.rows:,} rows, index built in {build_seconds:.2f} s, {args.queries} queries match pandas")
+    for name, samples in timings.items():
+        samples = np.array(samples) * 1000
+        report[name] = {'p50_ms': float(np.percentile(samples, 50)), 'p95_ms': float(np.percentile(samples, 95))}
+        print(f"  {name:<13} p50 {report[name]['p50_ms']:8.3f} ms  p95 {report[name]['p95_ms']:8.3f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
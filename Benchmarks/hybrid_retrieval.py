@@ -0,0 +1,105 @@
+"""
+Latency and hit rate of dense, BM25 and hybrid (reciprocal rank fusion) retrieval.
+
+Builds a synthetic corpus and a labelled query set from it: questions naming
+a country code and a category ("cancellation figure for bookings from PRT"),
+whose relevant documents are those with that country and category, and exact
+group lookups ("group 1234"), whose only relevant document is that group.
+Reports hit-rate@k (a relevant document in the top k), precision@k and median
+per-query latency for each retrieval mode.
+
+    python -m Benchmarks.hybrid_retrieval --size 20000
+    python -m Benchmarks.hybrid_retrieval --size 20000 --stub
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from Benchmarks.synthetic import CATEGORIES, COUNTRIES, StubEmbedder, make_documents, write_documents
+from Backend.ML.RagLLMs import RAGLLM
+
+def labelled_queries(documents, n, seed=1):
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i in range(n):
+        if i % 2:
+            doc = int(rng.integers(len(documents)))
+            queries.append((f"What happened in group {doc}?", {doc}))
+        else:
+            country = COUNTRIES[rng.integers(len(COUNTRIES))]
+            category = CATEGORIES[rng.integers(len(CATEGORIES))]
+            relevant = {d['metadata']['doc'] for d in documents
+                        if d['metadata']['country'] == country and d['metadata']['category'] == category}
+            queries.append((f"What is the {category} figure for bookings from {country}?", relevant))
+    return queries
+
+def evaluate(retrieve, queries, k):
+    hits, precision, latencies = 0, 0.0, []
+    for query, relevant in queries:
+        started = time.perf_counter()
+        docs = retrieve(query)
+        latencies.append(time.perf_counter() - started)
+        found = [doc['metadata']['doc'] for doc in docs[:k]]
+        hits += any(doc in relevant for doc in found)
+        precision += sum(doc in relevant for doc in found) / k
+    return {
+        'hit_rate_at_k': hits / len(queries),
+        'precision_at_k': precision / len(queries),
+        'p50_ms': float(np.median(latencies) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=20_000, help='Synthetic corpus size')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--stub', action='store_true', help='Hash-seeded embedder instead of MiniLM')
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+
+    if args.stub:
+        embedder = StubEmbedder()
+    else:
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer('all-MiniLM-L6-v2')
+
+    documents = make_documents(args.size)
+    queries = labelled_queries(documents, args.queries)
+    with tempfile.TemporaryDirectory() as root:
+        data_path = os.path.join(root, 'formatted_analysis.json')
+        write_documents(data_path, documents)
+        paths = {
+            'booking_data_path': data_path,
+            'index_path': os.path.join(root, 'faiss_index.index'),
+            'storage_file': os.path.join(root, 'local_db.jsonl'),
+            'embedding_store_dir': os.path.join(root, 'embeddings'),
+            'document_store_dir': os.path.join(root, 'documents')
+        }
+        started = time.perf_counter()
+        rag = RAGLLM(embedder=embedder, llm=object(), retrieval_mode='hybrid', **paths)
+        build_seconds = time.perf_counter() - started
+        dense = RAGLLM(embedder=embedder, llm=object(), retrieval_mode='dense', **paths)
+
+        modes = {
+            'dense': lambda q: dense.retrieve_documents(q, args.k),
+            'bm25': lambda q: rag.lookup_documents(rag.lexical_index.search(q, args.k)[0].tolist(), args.k),
+            'hybrid': lambda q: rag.retrieve_documents(q, args.k)
+        }
+        report = {}
+        for mode, retrieve in modes.items():
+            report[mode] = evaluate(retrieve, queries, args.k)
+            row = report[mode]
+            print(f"{mode:<7} hit@{args.k} {row['hit_rate_at_k']:.3f}  precision@{args.k} {row['precision_at_k']:.3f}  "
+                  f"p50 {row['p50_ms']:7.3f} ms  p95 {row['p95_ms']:7.3f} ms")
+        print(f"index build (dense + BM25) {build_seconds:.1f} s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'size': args.size, 'k': args.k, 'stub': args.stub, 'build_seconds': build_seconds,
+                       'results': report}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
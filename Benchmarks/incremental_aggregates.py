@@ -0,0 +1,115 @@
+"""
+Incremental KPI refresh against full recomputation.
+
+Writes a synthetic bookings CSV, then appends batches to it. After every
+append it refreshes an IncrementalAggregates (and a fresh one restored from
+the checkpoint, as after a restart), checks the KPIs against a full
+DataAnalyzer.aggregate() over the whole file and reports both timings.
+Exits with status 1 on any mismatch.
+
+    python -m Benchmarks.incremental_aggregates --base 1000000 --batch 1000 --appends 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from Benchmarks.synthetic import make_bookings
+from Backend.ML.analytics import DataAnalyzer
+from Backend.ML.booking_store import BookingStore
+from Backend.ML.incremental_aggregates import IncrementalAggregates
+
+def mismatches(incremental, full):
+    """
+    Fields that differ. Counts, labels and lead times must be identical,
+    revenue equal up to summation order.
+    """
+    found = []
+    if incremental.cancellation_rate != full.cancellation_rate:
+        found.append('cancellation_rate')
+    for field in ('country_counts', 'segment_counts', 'room_counts', 'meal_counts'):
+        a, b = getattr(incremental, field), getattr(full, field)
+        if a.index.tolist() != b.index.tolist() or a.tolist() != b.tolist():
+            found.append(field)
+    if (incremental.lead_time.start != full.lead_time.start
+            or not np.array_equal(incremental.lead_time.counts, full.lead_time.counts)):
+        found.append('lead_time')
+    a, b = incremental.revenue_trend, full.revenue_trend
+    if (a['arrival_date'].astype(str).tolist() != b['arrival_date'].astype(str).tolist()
+            or not np.allclose(a['revenue'].to_numpy(), b['revenue'].to_numpy(), rtol=1e-12, atol=0)):
+        found.append('revenue_trend')
+    return found
+
+def full_aggregate(csv_path, root):
+    # A fresh cache per call so the timing includes the rescan
+    store = BookingStore(csv_path, os.path.join(root, 'cache', f'full-{time.time_ns()}.parquet'))
+    started = time.perf_counter()
+    results = DataAnalyzer(store=store).aggregate()
+    return results, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base', type=int, default=100_000, help='Rows in the initial CSV')
+    parser.add_argument('--batch', type=int, default=1_000, help='Rows per append')
+    parser.add_argument('--appends', type=int, default=10)
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+
+    report = []
+    failures = []
+    with tempfile.TemporaryDirectory() as root:
+        csv_path = os.path.join(root, 'cleaned_hotel_bookings.csv')
+        checkpoint_path = os.path.join(root, 'cache', 'aggregates.json')
+        make_bookings(args.base).to_csv(csv_path, index=False)
+        aggregates = IncrementalAggregates(csv_path, checkpoint_path)
+        started = time.perf_counter()
+        aggregates.refresh()
+        print(f"initial ingest of {args.base:,} rows  {time.perf_counter() - started:8.3f} s")
+
+        for step in range(1, args.appends + 1):
+            make_bookings(args.batch, seed=step).to_csv(csv_path, mode='a', header=False, index=False)
+            started = time.perf_counter()
+            added = aggregates.refresh()
+            refresh_seconds = time.perf_counter() - started
+
+            full, full_seconds = full_aggregate(csv_path, root)
+            step_failures = []
+            if added != args.batch:
+                step_failures.append(f"refresh read {added} rows, expected {args.batch}")
+            step_failures.extend(f"incremental {field}" for field in mismatches(aggregates.results(), full))
+            # A restart picks up from the checkpoint without rescanning
+            restored = IncrementalAggregates(csv_path, checkpoint_path)
+            rescanned = restored.refresh()
+            if rescanned != 0:
+                step_failures.append(f"restored checkpoint rescanned {rescanned} rows")
+            step_failures.extend(f"restored {field}" for field in mismatches(restored.results(), full))
+            failures.extend(f"append {step}: {failure}" for failure in step_failures)
+
+            row = {'rows': aggregates.rows, 'refresh_s': refresh_seconds, 'full_s': full_seconds}
+            report.append(row)
+            print(f"{row['rows']:>11,} rows  refresh {refresh_seconds * 1000:8.2f} ms  "
+                  f"full {full_seconds * 1000:9.2f} ms  {'MISMATCH' if step_failures else 'match ok'}")
+
+        # Shards merged together equal one pass over all rows
+        shards = [IncrementalAggregates(csv_path, os.path.join(root, f'shard-{i}.json')) for i in range(2)]
+        frame = pd.read_csv(csv_path, dtype={'arrival_date': str})
+        shards[0].ingest(frame.iloc[:len(frame) // 2])
+        shards[1].ingest(frame.iloc[len(frame) // 2:])
+        shards[0].merge(shards[1])
+        merged_failures = mismatches(shards[0].results(), full)
+        failures.extend(f"merged shards {field}" for field in merged_failures)
+        print(f"merged shards {'MISMATCH' if merged_failures else 'match ok'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
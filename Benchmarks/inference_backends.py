@@ -0,0 +1,116 @@
+"""
+Load time, throughput and output parity of the embedder/generator inference backends.
+
+For each backend in Backend.ML.inference_backends (fp32 PyTorch, int8
+PyTorch, ONNX Runtime fp32 and int8) reports the first load (which includes
+the one-time ONNX export) and a second, cached load, embedding throughput,
+generation tokens/sec, and parity with the PyTorch path: the mean cosine
+similarity of the embeddings and the share of greedy answers identical to
+the fp32 answers.
+
+    python -m Benchmarks.inference_backends
+    python -m Benchmarks.inference_backends --backends torch onnx-int8 --skip-generator
+"""
+import argparse
+import json
+import tempfile
+import time
+import numpy as np
+from Benchmarks.synthetic import make_documents
+from Backend.ML import inference_backends
+from Backend.ML.RagLLMs import RAGLLM
+
+def timed_load(loader, *args):
+    started = time.perf_counter()
+    model = loader(*args)
+    return model, time.perf_counter() - started
+
+def embedding_benchmark(backend, cache_dir, texts, reference=None):
+    _, first_load = timed_load(inference_backends.load_embedder, 'all-MiniLM-L6-v2', backend, cache_dir)
+    embedder, cached_load = timed_load(inference_backends.load_embedder, 'all-MiniLM-L6-v2', backend, cache_dir)
+    embedder.encode(texts[:32], convert_to_numpy=True)  # Warm-up
+    started = time.perf_counter()
+    vectors = np.asarray(embedder.encode(texts, convert_to_numpy=True, batch_size=32), dtype=np.float32)
+    seconds = time.perf_counter() - started
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    row = {'first_load_s': first_load, 'cached_load_s': cached_load, 'sentences_per_s': len(texts) / seconds}
+    if reference is not None:
+        row['mean_cosine'] = float(np.mean(np.sum(vectors * reference, axis=1)))
+    return row, vectors
+
+def generation_benchmark(backend, cache_dir, prompts, new_tokens, reference=None):
+    _, first_load = timed_load(inference_backends.load_generator, inference_backends.GENERATOR_MODEL,
+                               backend, cache_dir)
+    generator, cached_load = timed_load(inference_backends.load_generator, inference_backends.GENERATOR_MODEL,
+                                        backend, cache_dir)
+    tokenizer = generator.tokenizer
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    # Fixed-length greedy decoding for tokens/sec
+    generated, seconds = 0, 0.0
+    for prompt in prompts:
+        inputs = tokenizer(prompt, return_tensors="pt").to(generator.model.device)
+        started = time.perf_counter()
+        output = generator.model.generate(**inputs, max_new_tokens=new_tokens, min_new_tokens=new_tokens,
+                                          do_sample=False, pad_token_id=tokenizer.pad_token_id)
+        seconds += time.perf_counter() - started
+        generated += output.shape[1] - inputs['input_ids'].shape[1]
+
+    # Answers with the engine's own generation settings
+    answers = [output[0]['generated_text'][len(prompt):].strip()
+               for output, prompt in zip(generator(prompts, **RAGLLM.generation_kwargs), prompts)]
+    row = {'first_load_s': first_load, 'cached_load_s': cached_load, 'tokens_per_s': generated / seconds}
+    if reference is not None:
+        row['identical_answers'] = sum(a == b for a, b in zip(answers, reference)) / len(prompts)
+    return row, answers
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=list(inference_backends.BACKENDS),
+                        choices=inference_backends.BACKENDS)
+    parser.add_argument('--texts', type=int, default=2000, help='Documents to embed')
+    parser.add_argument('--prompts', type=int, default=8)
+    parser.add_argument('--new-tokens', type=int, default=50)
+    parser.add_argument('--cache-dir', help='ONNX export cache (a temporary directory by default)')
+    parser.add_argument('--skip-generator', action='store_true')
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+
+    documents = make_documents(args.texts)
+    texts = [doc['text'] for doc in documents]
+    prompts = [f"Context: {doc['text']}\nQuestion: What does this say about {doc['metadata']['category']}?\nAnswer:"
+               for doc in documents[:args.prompts]]
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = args.cache_dir or tmp
+        reference_vectors, reference_answers = None, None
+        # The fp32 PyTorch path is the parity reference, so it runs first
+        for backend in sorted(args.backends, key=lambda b: b != 'torch'):
+            row, vectors = embedding_benchmark(backend, cache_dir, texts, reference_vectors)
+            report[backend] = {'embedder': row}
+            line = (f"{backend:<10} embed  load {row['first_load_s']:6.1f}/{row['cached_load_s']:5.1f} s  "
+                    f"{row['sentences_per_s']:8.0f} sent/s")
+            if 'mean_cosine' in row:
+                line += f"  cosine {row['mean_cosine']:.4f}"
+            print(line)
+
+            if not args.skip_generator:
+                row, answers = generation_benchmark(backend, cache_dir, prompts, args.new_tokens, reference_answers)
+                report[backend]['generator'] = row
+                line = (f"{backend:<10} gen    load {row['first_load_s']:6.1f}/{row['cached_load_s']:5.1f} s  "
+                        f"{row['tokens_per_s']:8.1f} tok/s")
+                if 'identical_answers' in row:
+                    line += f"  identical answers {row['identical_answers']:.0%}"
+                print(line)
+            if backend == 'torch':
+                reference_vectors = vectors
+                reference_answers = None if args.skip_generator else answers
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'texts': args.texts, 'prompts': args.prompts, 'results': report}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""
+The Flask app with synthetic stand-in models, started by Benchmarks.load_test.
+
+Run from a directory holding Data/cleaned_hotel_bookings.csv and
+Data/formatted_analysis.json, with the repository on PYTHONPATH. The RAG
+engine uses StubEmbedder and StubGenerator, so nothing is downloaded, and is
+loaded before the server starts listening.
+
+    python -m Benchmarks.load_server --port 5099 --token-delay-ms 2
+"""
+import argparse
+import logging
+from Benchmarks.synthetic import StubEmbedder, StubGenerator
+from Backend.ML import engine
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--token-delay-ms', type=float, default=2.0, help='StubGenerator time per generated token')
+    args = parser.parse_args()
+
+    # Must be in place before app imports trigger any engine build
+    engine.rag_engine.engine_kwargs.update(embedder=StubEmbedder(), llm=StubGenerator(args.token_delay_ms))
+    from app import app
+    engine.rag_engine.warm_up(background=False)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    app.run(host='127.0.0.1', port=args.port, threaded=True, debug=False, use_reloader=False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""
+Offline load test and regression check for /ask and /analytics.
+
+Writes a synthetic bookings CSV and formatted_analysis.json corpus to a
+temporary directory, starts the Flask app there with stand-in models
+(Benchmarks.load_server), and drives each scenario at every concurrency
+level. Reports startup time, cold /analytics build time, throughput,
+p50/p95/p99 latency, errors and the server's RSS.
+
+--save writes the results as a JSON baseline. --baseline compares against
+one and exits with status 1 when a latency, RSS or startup figure grows, or
+throughput drops, by more than --threshold (with --min-delta-ms of slack
+for latencies).
+
+    python -m Benchmarks.load_test --concurrency 1 8 32 --save Benchmarks/baselines/load.json
+    python -m Benchmarks.load_test --concurrency 1 8 32 --baseline Benchmarks/baselines/load.json
+"""
+import argparse
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+from Benchmarks.synthetic import COUNTRIES, SEGMENTS, make_bookings, make_documents, write_documents
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def ask_request(i):
+    """Mix of numeric questions, repeated questions (answer cache) and new questions (retrieval + generation)"""
+    kind = i % 4
+    if kind == 0:
+        question = f"What is the cancellation rate for {COUNTRIES[i % len(COUNTRIES)]} in {2015 + i % 3}?"
+    elif kind == 1:
+        question = "How long do guests usually stay?"
+    else:
+        question = f"What happened with the bookings in group {i}?"
+    return 'POST', '/ask', {'message': question}
+
+def analytics_query_request(i):
+    year = 2015 + i % 3
+    path = (f"/analytics/query?start={year}-01-01&end={year}-12-31"
+            f"&country={COUNTRIES[i % len(COUNTRIES)]}&customer_segment={SEGMENTS[i % len(SEGMENTS)]}")
+    return 'GET', path, None
+
+SCENARIOS = {
+    'ask': ask_request,
+    'analytics': lambda i: ('GET', '/analytics', None),
+    'analytics_data': lambda i: ('GET', '/analytics/data?points=500', None),
+    'analytics_query': analytics_query_request
+}
+
+# Figures compared against a baseline: (key, True when higher is worse)
+CHECKS = [('p50_ms', True), ('p95_ms', True), ('p99_ms', True), ('throughput_rps', False), ('rss_mb', True)]
+
+def send(base_url, method, path, body=None, timeout=120):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method,
+                                 headers={'Content-Type': 'application/json'} if data else {})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return response.status, response.read()
+
+def rss_mb(pid):
+    """Current and peak resident set size from /proc (Linux only)"""
+    usage = {}
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    usage[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return None, None
+    return usage.get('VmRSS'), usage.get('VmHWM')
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def write_fixture(root, bookings, documents):
+    data_dir = os.path.join(root, 'Data')
+    os.makedirs(data_dir, exist_ok=True)
+    make_bookings(bookings).to_csv(os.path.join(data_dir, 'cleaned_hotel_bookings.csv'), index=False)
+    write_documents(os.path.join(data_dir, 'formatted_analysis.json'), make_documents(documents))
+
+def start_server(root, port, token_delay_ms, timeout=300):
+    """Start the app and wait until /ready; returns (process, seconds to ready)"""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    log = open(os.path.join(root, 'server.log'), 'w')
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-m', 'Benchmarks.load_server', '--port', str(port),
+                             '--token-delay-ms', str(token_delay_ms)],
+                            cwd=root, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    while time.perf_counter() - started < timeout:
+        if proc.poll() is not None:
+            break
+        try:
+            status, _ = send(base_url, 'GET', '/ready', timeout=5)
+            if status == 200:
+                return proc, time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    with open(os.path.join(root, 'server.log'), 'r') as f:
+        raise RuntimeError(f"Server did not become ready:\n{f.read()[-4000:]}")
+
+def run_scenario(base_url, make_request, concurrency, total):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= total:
+                return
+            method, path, body = make_request(i)
+            started = time.perf_counter()
+            try:
+                status, _ = send(base_url, method, path, body)
+                ok = status < 400
+            except (urllib.error.URLError, ConnectionError, OSError):
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        'requests': total,
+        'errors': errors,
+        'throughput_rps': len(latencies) / wall,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max())
+    }
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Figures that regressed by more than threshold (a fraction) against the baseline"""
+    regressions = []
+    pairs = [('startup_seconds', results.get('startup_seconds'), baseline.get('startup_seconds'), True),
+             ('analytics_cold_ms', results.get('analytics_cold_ms'), baseline.get('analytics_cold_ms'), True)]
+    for name, row in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        pairs.extend((f"{name}.{key}", row.get(key), base.get(key), higher_is_worse) for key, higher_is_worse in CHECKS)
+        if row['errors'] > base.get('errors', 0):
+            regressions.append(f"{name}.errors: {base.get('errors', 0)} -> {row['errors']}")
+
+    for name, value, base, higher_is_worse in pairs:
+        if value is None or base is None or base == 0:
+            continue
+        change = (value - base) / base
+        slack = min_delta_ms if name.endswith('_ms') else 0.0
+        if higher_is_worse and change > threshold and value - base > slack:
+            regressions.append(f"{name}: {base:.2f} -> {value:.2f} (+{change:.0%})")
+        elif not higher_is_worse and -change > threshold:
+            regressions.append(f"{name}: {base:.2f} -> {value:.2f} ({change:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and concurrency level')
+    parser.add_argument('--bookings', type=int, default=100_000, help='Synthetic booking rows')
+    parser.add_argument('--documents', type=int, default=5000, help='Synthetic RAG documents')
+    parser.add_argument('--token-delay-ms', type=float, default=2.0, help='Stand-in LLM time per generated token')
+    parser.add_argument('--save', help='Write the results as a JSON baseline')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative regression')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='Latency changes below this never fail')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        write_fixture(root, args.bookings, args.documents)
+        port = free_port()
+        proc, startup_seconds = start_server(root, port, args.token_delay_ms)
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            results = {
+                'config': {key: getattr(args, key) for key in
+                           ('concurrency', 'requests', 'bookings', 'documents', 'token_delay_ms')},
+                'startup_seconds': startup_seconds,
+                'scenarios': {}
+            }
+            results['startup_rss_mb'], _ = rss_mb(proc.pid)
+            print(f"startup {startup_seconds:.1f} s  RSS {results['startup_rss_mb'] or 0:.0f} MB")
+
+            # The first /analytics builds the snapshot and renders every chart
+            started = time.perf_counter()
+            send(base_url, 'GET', '/analytics')
+            results['analytics_cold_ms'] = 1000 * (time.perf_counter() - started)
+            print(f"cold /analytics {results['analytics_cold_ms']:.0f} ms")
+
+            for scenario in args.scenarios:
+                for concurrency in args.concurrency:
+                    row = run_scenario(base_url, SCENARIOS[scenario], concurrency, args.requests)
+                    row['rss_mb'], row['peak_rss_mb'] = rss_mb(proc.pid)
+                    name = f"{scenario}@c{concurrency}"
+                    results['scenarios'][name] = row
+                    print(f"{name:<22} {row['throughput_rps']:8.1f} req/s  p50 {row['p50_ms']:8.1f}  "
+                          f"p95 {row['p95_ms']:8.1f}  p99 {row['p99_ms']:8.1f} ms  errors {row['errors']}  "
+                          f"RSS {row['rss_mb'] or 0:.0f} MB")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Per-worker memory of the RAG document/index storage modes.
+
+Builds a synthetic corpus, then starts several worker processes that each
+load a RAGLLM in 'memory' or 'mmap' mode at the same time and report RSS and
+PSS (proportional set size, which splits shared pages between processes).
+
+    python -m Benchmarks.mmap_memory --sizes 10000 100000 1000000 --workers 4
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import numpy as np
+from Benchmarks.synthetic import StubEmbedder, make_documents, make_embeddings, write_documents
+from Backend.ML.embedding_store import EmbeddingStore
+from Backend.ML.RagLLMs import RAGLLM
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+def memory_usage_mb():
+    """RSS and PSS of the current process from /proc (Linux only)"""
+    usage = {}
+    with open('/proc/self/smaps_rollup', 'r') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                usage[key.lower() + '_mb'] = int(value.split()[0]) / 1024
+    return usage
+
+def build_fixture(root, n):
+    documents = make_documents(n)
+    data_path = os.path.join(root, 'formatted_analysis.json')
+    write_documents(data_path, documents)
+
+    # Seed the embedding store so no model is needed to build the index
+    store = EmbeddingStore(os.path.join(root, 'embeddings'), MODEL_NAME)
+    ids = [store.document_id(doc['text']) for doc in documents]
+    store.save(np.array(ids, dtype=np.int64), make_embeddings(n))
+    paths = fixture_paths(root)
+    RAGLLM(embedder=StubEmbedder(), llm=object(), storage_mode='mmap', **paths)
+    return paths
+
+def fixture_paths(root):
+    return {
+        'booking_data_path': os.path.join(root, 'formatted_analysis.json'),
+        'index_path': os.path.join(root, 'faiss_index.index'),
+        'storage_file': os.path.join(root, 'local_db.jsonl'),
+        'embedding_store_dir': os.path.join(root, 'embeddings'),
+        'document_store_dir': os.path.join(root, 'documents')
+    }
+
+def worker(paths, mode, barrier, results):
+    baseline = memory_usage_mb()
+    rag = RAGLLM(embedder=StubEmbedder(), llm=object(), storage_mode=mode, **paths)
+    for query in ('cancellation rate in PRT', 'average stay', 'revenue by segment'):
+        rag.retrieve_documents(query)
+    loaded = memory_usage_mb()
+    # Measure while every worker holds its engine so shared pages are split
+    barrier.wait()
+    shared = memory_usage_mb()
+    results.put({
+        'rss_mb': shared['rss_mb'] - baseline['rss_mb'],
+        'pss_mb': shared['pss_mb'] - baseline['pss_mb'],
+        'load_rss_mb': loaded['rss_mb'] - baseline['rss_mb']
+    })
+    barrier.wait()
+
+def measure(paths, mode, workers):
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(paths, mode, barrier, results)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    samples = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    return {key: sum(s[key] for s in samples) / len(samples) for key in samples[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+
+    report = []
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as root:
+            paths = build_fixture(root, n)
+            for mode in ('memory', 'mmap'):
+                row = {'documents': n, 'mode': mode, 'workers': args.workers, **measure(paths, mode, args.workers)}
+                report.append(row)
+                print(f"{n:>9,} docs  {mode:<6}  RSS/worker {row['rss_mb']:8.1f} MB  "
+                      f"PSS/worker {row['pss_mb']:8.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Exactness check for StructuredAnswerer on synthetic bookings.
+
+Questions the bookings table settles must be answered with the figure
+computed directly with pandas. Questions carrying anything the parser does
+not recognise (country names, numeric conditions, comparisons, several
+years) must return None so they fall back to retrieval and generation
+instead of a wrong answer presented as exact. Exits with status 1 on any
+mismatch.
+
+    python -m Benchmarks.structured_answers --rows 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+from Benchmarks.synthetic import make_bookings
+from Backend.ML.booking_index import BookingIndex
+from Backend.ML.booking_store import BookingStore
+from Backend.ML.structured_answers import StructuredAnswerer
+
+# Question -> pandas mask of the bookings it is about, and the metric expected
+ANSWERED = [
+    ("How many bookings in 2016?", lambda df: df['arrival_date'].str.startswith('2016'), 'bookings'),
+    ("How many bookings from PRT in 2016?",
+     lambda df: df['arrival_date'].str.startswith('2016') & (df['country'] == 'PRT'), 'bookings'),
+    ("What is the cancellation rate for City Hotel?", lambda df: df['hotel'] == 'City Hotel', 'cancellation_rate'),
+    ("What was the cancellation rate in March 2017?",
+     lambda df: df['arrival_date'].str.startswith('2017-03'), 'cancellation_rate'),
+    ("How many cancellations for Loyal customers?", lambda df: df['customer_segment'] == 'Loyal', 'cancellations'),
+    ("What is the total revenue for room type A?", lambda df: df['reserved_room_type'] == 'A', 'revenue'),
+    ("How many bookings for meal plan BB in 2015?",
+     lambda df: df['arrival_date'].str.startswith('2015') & (df['meal'] == 'BB'), 'bookings'),
+    ("Which countries have the most bookings?", lambda df: df['country'].notna(), 'top_countries'),
+]
+
+# None of these may be answered from the table
+DECLINED = [
+    "How many bookings from Portugal in 2016?",
+    "How many bookings had a lead time over 100 days?",
+    "How many bookings for 2 adults?",
+    "What is the cancellation rate for guests who booked more than 30 days ahead?",
+    "Is the cancellation rate higher for City Hotel than Resort Hotel?",
+    "What was the cancellation rate for City Hotel and Resort Hotel?",
+    "How many bookings in 2015 and 2017?",
+    "How many bookings from PRT compared to GBR?",
+    "How many bookings in March?",
+    "What is the average revenue per booking in 2016?",
+    "How many bookings from XYZ?",
+    "How many weekend bookings in 2016?",
+]
+
+def expected(df, metric):
+    if metric == 'bookings':
+        return f"{len(df):,}"
+    if metric == 'cancellations':
+        return f"{int(df['is_canceled'].sum()):,}"
+    if metric == 'cancellation_rate':
+        return f"{round(100 * df['is_canceled'].sum() / len(df), 2):.2f}%"
+    if metric == 'revenue':
+        return f"{round(float(df['revenue'].sum()), 2):,.2f}"
+    if metric == 'top_countries':
+        return df['country'].value_counts().index[0]
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20_000)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as root:
+        csv_path = os.path.join(root, 'cleaned_hotel_bookings.csv')
+        make_bookings(args.rows).to_csv(csv_path, index=False)
+        store = BookingStore(csv_path, os.path.join(root, 'cache', 'bookings.parquet'))
+        df = store.load()
+        df['arrival_date'] = df['arrival_date'].astype(str)
+        answerer = StructuredAnswerer(BookingIndex(store))
+
+        for question, mask, metric in ANSWERED:
+            answer = answerer.answer(question)
+            if answer is None:
+                failures.append(f"not answered: {question}")
+                continue
+            response, details = answer
+            figure = expected(df[mask(df).to_numpy()], metric)
+            ok = details['metric'] == metric and figure in response
+            print(f"{'ok  ' if ok else 'FAIL'} {question} -> {response}")
+            if not ok:
+                failures.append(f"wrong answer: {question} -> {response} (expected {metric} {figure})")
+
+        for question in DECLINED:
+            answer = answerer.answer(question)
+            ok = answer is None
+            print(f"{'ok  ' if ok else 'FAIL'} {question} -> {'declined' if ok else answer[0]}")
+            if not ok:
+                failures.append(f"answered but should fall back: {question} -> {answer[0]}")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("structured answers exact ok")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import time
+import numpy as np
+
+CATEGORIES = ['cancellation', 'booking', 'stay', 'revenue', 'country', 'segment']
+COUNTRIES = ['PRT', 'GBR', 'FRA', 'ESP', 'DEU', 'ITA', 'IRL', 'BEL', 'BRA', 'NLD']
+
+def make_documents(n, seed=0):
+    """Synthetic corpus in the formatted_analysis.json layout"""
+    rng = np.random.default_rng(seed)
+    documents = []
+    for i in range(n):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        country = COUNTRIES[rng.integers(len(COUNTRIES))]
+        rate = rng.uniform(5, 60)
+        documents.append({
+            "text": f"Bookings from {country} in group {i} show a {category} figure of {rate:.2f}% "
+                    f"with an average stay of {rng.uniform(1, 10):.1f} nights.",
+            "metadata": {"category": category, "country": country, "doc": i}
+        })
+    return documents
+
+def make_embeddings(n, dim=384, seed=0):
+    """Random unit vectors standing in for MiniLM embeddings"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def make_clustered_embeddings(n, dim=384, clusters=256, spread=0.35, seed=0):
+    """Unit vectors grouped around random centres, closer to real sentence embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centres[rng.integers(clusters, size=n)]
+    vectors += spread * rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def write_documents(path, documents):
+    with open(path, 'w') as f:
+        json.dump(documents, f)
+
+
+class StubEmbedder:
+    """Deterministic hash-seeded embedder with the SentenceTransformer encode signature"""
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+            vectors[row] = np.random.default_rng(seed).standard_normal(self.dim)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+HOTELS = ['City Hotel', 'Resort Hotel']
+MEALS = ['BB', 'HB', 'SC', 'FB', 'Undefined']
+ROOM_TYPES = ['A', 'D', 'E', 'F', 'G', 'B', 'C', 'H']
+SEGMENTS = ['Standard', 'Risk', 'Loyal', 'High-Maintenance']
+
+def make_bookings(n, seed=0):
+    """Synthetic rows in the cleaned_hotel_bookings.csv layout"""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2015-07-01', '2017-08-31', freq='D').strftime('%Y-%m-%d')
+    return pd.DataFrame({
+        'hotel': np.array(HOTELS)[rng.integers(len(HOTELS), size=n)],
+        'arrival_date': dates[rng.integers(len(dates), size=n)],
+        'is_canceled': rng.integers(2, size=n),
+        'lead_time': rng.gamma(1.2, 90, size=n).astype(np.int64),
+        'adr': rng.uniform(0, 250, size=n).round(2),
+        'stays_in_weekend_nights': rng.integers(3, size=n),
+        'stays_in_week_nights': rng.integers(6, size=n),
+        'country': np.array(COUNTRIES)[rng.integers(len(COUNTRIES), size=n)],
+        'meal': np.array(MEALS)[rng.integers(len(MEALS), size=n)],
+        'reserved_room_type': np.array(ROOM_TYPES)[rng.integers(len(ROOM_TYPES), size=n)],
+        'customer_segment': np.array(SEGMENTS)[rng.integers(len(SEGMENTS), size=n)]
+    })
+
+
+class WhitespaceTokenizer:
+    """Token counts for StubGenerator, one token per whitespace-separated word"""
+    pad_token = eos_token = '<eos>'
+
+    def __call__(self, text, **kwargs):
+        return {'input_ids': list(range(len(text.split())))}
+
+
+class StubGenerator:
+    """
+    Stand-in for the gpt2-medium text-generation pipeline: answers with the
+    start of the first context line, after token_delay_ms per generated
+    token. A batched call pays the delay once per decoding step, as batched
+    generation does.
+    """
+    def __init__(self, token_delay_ms=2.0):
+        self.token_delay = token_delay_ms / 1000.0
+        self.tokenizer = WhitespaceTokenizer()
+
+    def __call__(self, prompts, batch_size=None, max_new_tokens=50, **kwargs):
+        prompts = [prompts] if isinstance(prompts, str) else list(prompts)
+        answers = []
+        for prompt in prompts:
+            context = prompt.split('\n')[1] if '\n' in prompt else prompt
+            answers.append(' '.join(context.split()[:max_new_tokens]))
+        steps = max((len(answer.split()) for answer in answers), default=0)
+        time.sleep(steps * self.token_delay)
+        return [[{'generated_text': f"{prompt} {answer}"}] for prompt, answer in zip(prompts, answers)]
@@ -1,4 +1,142 @@
 // script.js
+const FONT_COLOR = 'white';
+const chartInstances = {};
+
+// Swap a chart's <img> for a <canvas> and (re)draw it with Chart.js
+function drawChart(id, config) {
+    const img = document.getElementById(id);
+    if (!img) return;
+    let canvas = document.getElementById(`${id}-canvas`);
+    if (!canvas) {
+        canvas = document.createElement('canvas');
+        canvas.id = `${id}-canvas`;
+        img.insertAdjacentElement('afterend', canvas);
+    }
+    img.hidden = true;
+    chartInstances[id]?.destroy();
+    chartInstances[id] = new Chart(canvas, config);
+}
+
+function axisOptions() {
+    const axis = { ticks: { color: FONT_COLOR }, grid: { color: 'rgba(255, 255, 255, 0.15)' } };
+    return { x: { ...axis }, y: { ...axis } };
+}
+
+function pieLegend() {
+    return { labels: { color: FONT_COLOR } };
+}
+
+// Writes the cancellation rate in the middle of the gauge
+const gaugeText = {
+    id: 'gaugeText',
+    afterDraw(chart, args, options) {
+        const { ctx, chartArea } = chart;
+        ctx.save();
+        ctx.fillStyle = FONT_COLOR;
+        ctx.font = '600 24px Inter, sans-serif';
+        ctx.textAlign = 'center';
+        ctx.fillText(options.text, (chartArea.left + chartArea.right) / 2, chartArea.bottom - 10);
+        ctx.restore();
+    }
+};
+
+function renderCharts(data) {
+    const colors = data.colors;
+    const noLegend = { legend: { display: false } };
+
+    drawChart('revenue-chart', {
+        type: 'line',
+        data: {
+            labels: data.revenue.dates,
+            datasets: [{ data: data.revenue.values, borderColor: FONT_COLOR, borderWidth: 2, pointRadius: 0 }]
+        },
+        options: { animation: false, plugins: noLegend, scales: axisOptions() }
+    });
+
+    const rate = data.cancellation_rate;
+    drawChart('gauge-chart', {
+        type: 'doughnut',
+        data: { datasets: [{ data: [rate, 100 - rate], backgroundColor: [colors[0], 'lightgray'], borderWidth: 0 }] },
+        options: {
+            rotation: -90, circumference: 180, cutout: '70%',
+            plugins: { ...noLegend, tooltip: { enabled: false }, gaugeText: { text: `${rate.toFixed(1)}%` } }
+        },
+        plugins: [gaugeText]
+    });
+
+    drawChart('country-chart', {
+        type: 'bar',
+        data: {
+            labels: data.countries.labels,
+            datasets: [{ data: data.countries.counts, backgroundColor: colors.slice(0, 5) }]
+        },
+        options: { plugins: noLegend, scales: axisOptions() }
+    });
+
+    drawChart('customer-seg-chart', {
+        type: 'doughnut',
+        data: {
+            labels: data.segments.labels,
+            datasets: [{ data: data.segments.counts, backgroundColor: colors.slice(0, data.segments.counts.length) }]
+        },
+        options: { plugins: { legend: pieLegend() } }
+    });
+
+    const leadTimeScales = axisOptions();
+    leadTimeScales.x.type = 'linear';
+    drawChart('lead-time-chart', {
+        type: 'line',
+        data: {
+            datasets: [{
+                data: data.lead_time.x.map((x, i) => ({ x: x, y: data.lead_time.density[i] })),
+                borderColor: colors[4], backgroundColor: `${colors[4]}80`, fill: true, pointRadius: 0
+            }]
+        },
+        options: { animation: false, plugins: noLegend, scales: leadTimeScales }
+    });
+
+    // Rooms on the outer ring, meals on the inner one, sharing one label list
+    const rooms = data.rooms;
+    const meals = data.meals;
+    drawChart('room-meal-chart', {
+        type: 'doughnut',
+        data: {
+            labels: rooms.labels.concat(meals.labels),
+            datasets: [
+                {
+                    data: rooms.counts.concat(meals.counts.map(() => 0)),
+                    backgroundColor: colors.slice(0, rooms.counts.length + meals.counts.length)
+                },
+                {
+                    data: rooms.counts.map(() => 0).concat(meals.counts),
+                    backgroundColor: colors.slice(0, rooms.counts.length + meals.counts.length)
+                }
+            ]
+        },
+        options: { plugins: { legend: pieLegend() } }
+    });
+}
+
+// Draws the charts in the browser from /analytics/data, or returns false
+async function fetchAnalyticsData() {
+    if (typeof Chart === 'undefined') return false;
+    try {
+        const points = Math.max(100, Math.round(window.innerWidth / 2));
+        const response = await fetch(`/analytics/data?points=${points}`);
+        if (!response.ok) throw new Error(`HTTP error! Status: ${response.status}`);
+        renderCharts(await response.json());
+        return true;
+    } catch (error) {
+        console.error('Error fetching analytics data, falling back to images:', error);
+        return false;
+    }
+}
+
+async function refreshAnalytics() {
+    if (!(await fetchAnalyticsData())) await fetchAnalytics();
+}
+
+// Server-rendered PNG charts, used when Chart.js or /analytics/data is unavailable
 async function fetchAnalytics() {
     try {
         console.log('Fetching analytics data...');
@@ -36,6 +174,74 @@ function sanitizeInput(text) {
     return div.innerHTML;
 }
 
+function parseSSE(block) {
+    const event = { type: 'message', data: '' };
+    block.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event.type = line.slice(6).trim();
+        else if (line.startsWith('data:')) event.data += line.slice(5).trim();
+    });
+    return event;
+}
+
+// Returns the final answer, or null when streaming is not available
+async function streamBotResponse(message, chatMessages, loadingMessageDiv) {
+    const response = await fetch('/ask/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message: message })
+    });
+    if (!response.ok || !response.body) return null;
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let botParagraph = null;
+    let answer = '';
+
+    const showText = (text) => {
+        if (!botParagraph) {
+            // Swap the loading indicator for the answer on the first token
+            loadingMessageDiv.remove();
+            const botMessageDiv = document.createElement('div');
+            botMessageDiv.className = 'message bot';
+            botParagraph = document.createElement('p');
+            botMessageDiv.appendChild(botParagraph);
+            chatMessages.appendChild(botMessageDiv);
+            botMessageDiv.classList.add('visible');
+        }
+        botParagraph.textContent = text;
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const event = parseSSE(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+            if (!event.data) continue;
+            const payload = JSON.parse(event.data);
+
+            if (event.type === 'token') {
+                answer += payload.text;
+                showText(answer);
+            } else if (event.type === 'done') {
+                // The final answer is postprocessed and replaces the streamed text
+                answer = payload.response;
+                showText(answer);
+                console.log(`Time to first token: ${payload.ttft_ms} ms, total: ${payload.total_ms} ms`);
+            } else if (event.type === 'error') {
+                throw new Error(payload.error);
+            }
+        }
+    }
+    if (!botParagraph) throw new Error('Bot response failed');
+    return answer;
+}
+
 async function sendMessage() {
     const input = document.getElementById('message-input');
     const sendBtn = document.querySelector('.send-btn');
@@ -62,25 +268,28 @@ async function sendMessage() {
         chatMessages.appendChild(loadingMessageDiv);
         loadingMessageDiv.classList.add('visible');
 
-        // Get bot response
-        const response = await fetch('/ask', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ message: message })
-        });
-        
-        if (!response.ok) throw new Error('Bot response failed');
-        const data = await response.json();
+        // Stream the bot response, falling back to a single JSON reply
+        const botText = await streamBotResponse(message, chatMessages, loadingMessageDiv);
+        if (botText === null) {
+            const response = await fetch('/ask', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ message: message })
+            });
+
+            if (!response.ok) throw new Error('Bot response failed');
+            const data = await response.json();
 
-        // Remove loading message
-        chatMessages.removeChild(loadingMessageDiv);
+            // Remove loading message
+            chatMessages.removeChild(loadingMessageDiv);
 
-        // Add bot response
-        const botMessageDiv = document.createElement('div');
-        botMessageDiv.className = 'message bot';
-        botMessageDiv.innerHTML = `<p>${sanitizeInput(data.response)}</p>`;
-        chatMessages.appendChild(botMessageDiv);
-        botMessageDiv.classList.add('visible');
+            // Add bot response
+            const botMessageDiv = document.createElement('div');
+            botMessageDiv.className = 'message bot';
+            botMessageDiv.innerHTML = `<p>${sanitizeInput(data.response)}</p>`;
+            chatMessages.appendChild(botMessageDiv);
+            botMessageDiv.classList.add('visible');
+        }
 
         // Scroll to bottom
         chatMessages.scrollTop = chatMessages.scrollHeight;
@@ -140,7 +349,7 @@ function initializeDate() {
 document.addEventListener('DOMContentLoaded', () => {
     initializeDate();
     initializeChat();
-    fetchAnalytics();
+    refreshAnalytics();
 
-    document.getElementById('analyze-btn')?.addEventListener('click', fetchAnalytics);
+    document.getElementById('analyze-btn')?.addEventListener('click', refreshAnalytics);
 });
\ No newline at end of file
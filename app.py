@@ -1,52 +1,224 @@
-from flask import Flask, render_template,request,jsonify
-import base64
-from io import BytesIO
+from flask import Flask, render_template,request,jsonify, Response, stream_with_context
+import json
+import multiprocessing as mp
+import os
+import time
+import uuid
 from Backend.ML.analytics import DataAnalyzer
-from Backend.ML.RagLLMs import RAGLLM 
+from Backend.ML.analytics_cache import AnalyticsSnapshotCache
+from Backend.ML.chart_renderer import ChartRenderer
+from Backend.ML.incremental_aggregates import IncrementalAggregates
+from Backend.ML.engine import rag_engine, ask_batcher, booking_index
+from Backend.ML.metrics import REGISTRY, HTTP_REQUEST_SECONDS
+from Backend.ML.profiler import SamplingProfiler
 
 
 app = Flask(__name__, template_folder='Frontend/Templates', static_folder='Frontend/Static')
 
-def fig_to_base64(fig):
-    buf = BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight', transparent=True)
-    return base64.b64encode(buf.getbuffer()).decode("ascii")
+# Per-request sampling profiles (?profile=1 or X-Profile: 1), only when enabled for the deployment
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'Data/profiles')
+
+@app.before_request
+def start_request_timer():
+    request.environ['app.started'] = time.perf_counter()
+    if PROFILING_ENABLED and (request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'):
+        request.environ['app.profiler'] = SamplingProfiler().start()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = request.environ.get('app.started')
+    if started is None:
+        return response
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    method, status = request.method, str(response.status_code)
+    profiler = request.environ.get('app.profiler')
+    profile_path = None
+    if profiler is not None:
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint.strip('/').replace('/', '_') or 'home'}-{uuid.uuid4().hex[:8]}"
+        profile_path = os.path.join(PROFILE_DIR, name + '.folded')
+        response.headers['X-Profile-File'] = profile_path
+
+    # Streamed bodies are still being sent here, so finish once the response is closed
+    def _finish():
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=method, status=status)
+        if profiler is not None:
+            try:
+                profiler.stop().write(profile_path)
+            except OSError as e:
+                print(f"Warning: Failed to write profile - {str(e)}")
+
+    response.call_on_close(_finish)
+    return response
+
+
+def collect_component_stats():
+    """Cache hit ratios and queue figures the components already keep, sampled at scrape time"""
+    samples = [('rag_engine_ready', 'Whether the RAG engine is loaded in this worker', {}, int(rag_engine.is_ready()))]
+    if rag_engine.is_ready():
+        cache = rag_engine.get().answer_cache.stats()
+        samples.append(('rag_answer_cache_hit_ratio', 'Share of answer cache lookups served from the cache',
+                        {}, cache['hit_rate']))
+        samples.append(('rag_answer_cache_entries', 'Answers held in the answer cache', {}, cache['entries']))
+    index = booking_index.stats()
+    lookups = index['hits'] + index['misses']
+    samples.append(('booking_index_cache_hit_ratio', 'Share of filtered KPI queries served from the result cache',
+                    {}, index['hits'] / lookups if lookups else 0.0))
+    batcher = ask_batcher.stats()
+    samples.append(('rag_batcher_queue_depth', 'Questions waiting for the micro-batcher', {}, batcher['queue_depth']))
+    samples.append(('rag_batcher_avg_batch_size', 'Average questions per generation batch',
+                    {}, batcher['avg_batch_size']))
+    return samples
+
+REGISTRY.register_collector(collect_component_stats)
 
 @app.route('/')
 def home():
     return render_template('Home.html')
 
-@app.route('/analytics')
-def analytics():
-    analyzer = DataAnalyzer()
-    results = analyzer.generate_analytics()
+# KPIs are updated from appended bookings only, never a full rescan
+booking_aggregates = IncrementalAggregates()
+
+# Worker processes that draw and encode the PNG charts in parallel, started on the first build in each server worker
+render_workers = os.environ.get('ANALYTICS_RENDER_WORKERS')
+chart_renderer = ChartRenderer(int(render_workers) if render_workers else None)
+
+def build_analytics_payload():
+    booking_aggregates.refresh()
+    analyzer = DataAnalyzer(aggregates=booking_aggregates)
+    results = analyzer.generate_encoded_analytics(renderer=chart_renderer)
     
-    return jsonify({
-        'revenue_plot': fig_to_base64(results['revenue_fig']),
-        'gauge_plot': fig_to_base64(results['gauge_fig']),
-        'country_plot': fig_to_base64(results['country_fig']),
-        'customer_seg_fig': fig_to_base64(results['customer_seg_fig']),
-        'lead_time_fig': fig_to_base64(results['lead_time_fig']),
-        'room_meal_fig': fig_to_base64(results['room_meal_fig']),
+    return {
+        'revenue_plot': results['revenue_fig'],
+        'gauge_plot': results['gauge_fig'],
+        'country_plot': results['country_fig'],
+        'customer_seg_fig': results['customer_seg_fig'],
+        'lead_time_fig': results['lead_time_fig'],
+        'room_meal_fig': results['room_meal_fig'],
         'cancellation_rate': f"{results['cancellation_rate']:.1f}%",
         'countries': results['countries'],
         'segments': results['segments'],
         'rooms': results['rooms'],
         'meals': results['meals']
-    })
+    }
+
+# Rebuilt only when the bookings CSV changes
+analytics_cache = AnalyticsSnapshotCache(build_analytics_payload)
+
+@app.route('/analytics')
+def analytics():
+    snapshot = analytics_cache.get()
+    response = Response(snapshot['body'], mimetype='application/json')
+    response.set_etag(snapshot['etag'])
+    # Browsers revalidate with If-None-Match and get a 304 while the data is unchanged
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@app.route('/analytics/data')
+def analytics_data():
+    # Compact aggregates for charts drawn in the browser; /analytics stays as the PNG fallback
+    points = request.args.get('points', type=int)
+    if points is not None:
+        points = min(max(points, 3), 10000)
+    booking_aggregates.refresh()
+    payload = DataAnalyzer(aggregates=booking_aggregates).generate_data(points)
+    response = jsonify(payload)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@app.route('/analytics/query')
+def analytics_query():
+    # e.g. ?start=2016-01-01&end=2016-06-30&country=PRT,GBR&hotel=City Hotel
+    # ?profile=1 is handled by the request hooks and is not a filter
+    filters = {key: request.args.getlist(key) for key in request.args if key != 'profile'}
+    filters.update({bound: request.args.get(bound) for bound in ('start', 'end') if bound in request.args})
+    try:
+        result = booking_index.query(filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+@app.route('/ready')
+def ready():
+    # Without RAG_EAGER_WARMUP nothing loads the engine before the first /ask,
+    # which a load balancer never routes to an unready worker, so the probe starts it
+    if rag_engine.status()['state'] == 'cold':
+        rag_engine.warm_up()
+    status = rag_engine.status()
+    status['batcher'] = ask_batcher.stats()
+    status['chart_renderer'] = chart_renderer.stats()
+    status['booking_index'] = booking_index.stats()
+    if status['ready']:
+        status['answer_cache'] = rag_engine.get().answer_cache.stats()
+    return jsonify(status), (200 if status['ready'] else 503)
+
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text exposition format, per worker process
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/history')
+def history():
+    try:
+        rag_llm = rag_engine.get()
+    except Exception as e:
+        return jsonify({"error": f"RAG engine unavailable: {str(e)}"}), 503
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(max(1, request.args.get('limit', 50, type=int)), 500)
+    return jsonify({"offset": offset, "limit": limit, "interactions": rag_llm.get_history(offset, limit)})
 
 
 @app.route('/ask', methods=['POST'])
 def ask():
-    rag_llm = RAGLLM()
+    try:
+        rag_engine.get()
+    except Exception as e:
+        return jsonify({"error": f"RAG engine unavailable: {str(e)}"}), 503
     data = request.get_json()
     user_message = data.get('message', '')
+    # Optional metadata category to restrict retrieval to
+    category = data.get('category') or None
 
-    # Process the message using RAGLLM
-    result = rag_llm.process_message(user_message)
+    # Process the message using RAGLLM, batched with concurrent questions
+    result = ask_batcher((user_message, category))
     answer = result["response"]
 
     return jsonify({"response": answer})
 
+
+@app.route('/ask/stream', methods=['POST'])
+def ask_stream():
+    try:
+        rag_llm = rag_engine.get()
+    except Exception as e:
+        return jsonify({"error": f"RAG engine unavailable: {str(e)}"}), 503
+    data = request.get_json()
+    user_message = data.get('message', '')
+    category = data.get('category') or None
+
+    # Push answer text to the browser as Server-Sent Events while it is generated.
+    # Unlike /ask this bypasses the micro-batcher; generation takes turns with batches.
+    def events():
+        try:
+            for event in rag_llm.stream_message(user_message, category):
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'event': 'error', 'error': str(e)})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Load the models at startup instead of on the first question. Chart render
+# workers re-import this module when it is run as a script, and must not.
+if os.environ.get('RAG_EAGER_WARMUP', '').lower() in ('1', 'true', 'yes') and mp.parent_process() is None:
+    rag_engine.warm_up()
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file